@@ -1,9 +1,11 @@
+import asyncio
 import base64
+import logging
 import time
 from typing import Optional
 
 from .db import (
-    apply_trade,
+    apply_trade_and_finalize,
     enqueue_pending_trade,
     update_pending_trade_status,
     get_telegram_user_id,
@@ -27,6 +29,8 @@ from .solana_rpc import (
 )
 from .pump_quotes import get_bonding_curve_pda, decode_bonding_curve_state
 
+log = logging.getLogger("scrapetech.auto_trader")
+
 
 class TxFailed(Exception):
     def __init__(self, sig: str, err: str):
@@ -148,12 +152,13 @@ def confirm_trade(
 
             if sol_amount > 0 and token_amount_ui and token_amount_ui > 0:
                 try:
-                    apply_trade(telegram_user_id, mint, side, token_amount_ui, sol_amount, tx_sig=signature)
-                    update_pending_trade_status(
+                    apply_trade_and_finalize(
+                        telegram_user_id,
+                        mint,
+                        side,
+                        token_amount_ui,
+                        sol_amount,
                         signature,
-                        "SUCCESS",
-                        actual_token_amount=token_amount_ui,
-                        actual_sol_amount=sol_amount,
                     )
                     return {
                         "status": "SUCCESS",
@@ -173,13 +178,7 @@ def confirm_trade(
         sol_amount = abs(sol_delta) / 1_000_000_000
         token_amount_ui = abs(token_delta_ui)
         try:
-            apply_trade(telegram_user_id, mint, side, token_amount_ui, sol_amount, tx_sig=signature)
-            update_pending_trade_status(
-                signature,
-                "SUCCESS",
-                actual_token_amount=token_amount_ui,
-                actual_sol_amount=sol_amount,
-            )
+            apply_trade_and_finalize(telegram_user_id, mint, side, token_amount_ui, sol_amount, signature)
             http = get_http_client()
             onchain_bal = rpc_get_token_balance_for_owner_mint_any(http, owner_pubkey, mint)
             if onchain_bal is not None:
@@ -271,21 +270,36 @@ def auto_sell_for_position(telegram_user_id: str, mint: str, tokens_ui: float) -
     return sig
 
 
+def _monitor_once():
+    rows = list_positions_for_monitor()
+    for row in rows:
+        _evaluate_position(row)
+
+
 def monitor_positions_loop(interval: int = 10):
     while True:
-        rows = list_positions_for_monitor()
-        for row in rows:
-            _evaluate_position(row)
+        _monitor_once()
         time.sleep(max(1, int(interval)))
 
 
+async def monitor_positions_loop_async(interval: int = 10):
+    # Same loop for a shared event loop (cli daemon); a pass still does blocking
+    # RPC/DB work, so it runs in a worker thread.
+    while True:
+        try:
+            await asyncio.to_thread(_monitor_once)
+        except Exception:
+            log.exception("Monitor tick failed")
+        await asyncio.sleep(max(1, int(interval)))
+
+
 def list_positions_for_monitor():
     rows = []
     # get all positions for all users
     # list_positions expects telegram_user_id; query pending trades to get users
     # fetch users via sqlite directly for simplicity
-    from .db import connect
-    with connect() as conn:
+    from .db import connect_read
+    with connect_read() as conn:
         raw = conn.execute("SELECT DISTINCT user_id FROM positions WHERE open=1").fetchall()
     for r in raw:
         telegram_user_id = get_telegram_user_id(r["user_id"])
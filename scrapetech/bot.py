@@ -1,7 +1,11 @@
 import os
 import asyncio
 import base58
+import logging
 import re
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from telethon.tl.types import MessageEntitySpoiler
 from typing import Optional
 
@@ -49,6 +53,73 @@ from .solana_rpc import (
 )
 from .tx_errors import format_tx_error
 
+log = logging.getLogger("scrapetech.bot")
+
+
+_MISSING = object()
+
+
+class _ExpiringDict:
+    # Every entry gets the same ttl and a write moves its key to the end, so
+    # the OrderedDict stays sorted by expiry and stale entries sit at the front.
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if expires >= now:
+                break
+            del self._data[key]
+
+    def __setitem__(self, key, value):
+        self._expire()
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __delitem__(self, key):
+        if self.pop(key, _MISSING) is _MISSING:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        self._expire()
+        return len(self._data)
+
+    def __iter__(self):
+        self._expire()
+        return iter(list(self._data))
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return default
+        return value
+
+    def pop(self, key, default=None):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        del self._data[key]
+        return value
+
 
 def _get_bot_token() -> str:
     token = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
@@ -77,12 +148,18 @@ def _parse_sell_args(text: str) -> tuple[str, float]:
     return mint, pct
 
 
+@lru_cache(maxsize=None)
+def _btn(label: str, data: bytes):
+    # Static menu buttons are rebuilt on every render; reuse one object per payload.
+    return Button.inline(label, data)
+
+
 def _main_menu():
     return [
-        [Button.inline("💼 Wallet", b"menu:wallet"), Button.inline("📈 Positions", b"menu:positions")],
-        [Button.inline("⚡ Buy", b"menu:buy"), Button.inline("🔻 Sell", b"menu:sell")],
-        [Button.inline("🧪 Settings", b"menu:settings"), Button.inline("🛰️ Channels", b"menu:channels")],
-        [Button.inline("ℹ️ Help", b"menu:help")],
+        [_btn("💼 Wallet", b"menu:wallet"), _btn("📈 Positions", b"menu:positions")],
+        [_btn("⚡ Buy", b"menu:buy"), _btn("🔻 Sell", b"menu:sell")],
+        [_btn("🧪 Settings", b"menu:settings"), _btn("🛰️ Channels", b"menu:channels")],
+        [_btn("ℹ️ Help", b"menu:help")],
     ]
 
 def _main_status_text(user_id: str) -> str:
@@ -173,6 +250,14 @@ def _get_onchain_token_balance(user_id: str, mint: str) -> float | None:
         return None
     return float(bal) if bal is not None else None
 
+def _positions_text(rows) -> str:
+    return "\n".join(
+        f"{r['mint']} | tokens={r['token_balance']} | avg_entry={r['avg_entry_sol']} | "
+        f"pnl={r['realized_pnl_sol']} | open={r['open']}"
+        for r in rows
+    )
+
+
 def _wallet_overview_lines(user_id: str, limit: int = 10):
     pubkey = wallet_get_pubkey(user_id)
     if not pubkey:
@@ -207,7 +292,7 @@ def _wallet_overview_lines(user_id: str, limit: int = 10):
 def _wallet_tokens_buttons(user_id: str, limit: int = 10):
     pubkey = wallet_get_pubkey(user_id)
     if not pubkey:
-        return [[Button.inline("Back", b"menu:main")]]
+        return [[_btn("Back", b"menu:main")]]
     http = get_http_client()
     tokens = rpc_get_token_accounts_by_owner(http, pubkey)
     tokens = [t for t in tokens if float(t.get("ui_amount") or 0.0) > 0]
@@ -218,8 +303,8 @@ def _wallet_tokens_buttons(user_id: str, limit: int = 10):
         mint = t["mint"]
         label = f"Sell {mint[:6]}..."
         buttons.append([Button.inline(label, f"wallet_sell:{mint}".encode("utf-8"))])
-    buttons.append([Button.inline("Refresh", b"wallet:overview")])
-    buttons.append([Button.inline("Back", b"menu:main")])
+    buttons.append([_btn("Refresh", b"wallet:overview")])
+    buttons.append([_btn("Back", b"menu:main")])
     return buttons
 
 
@@ -233,36 +318,36 @@ def _sell_presets(user_id: str, mint: str):
             label = f"🔻 Sell {pct:g}%"
             row.append(Button.inline(label, f"sell:{mint}:{pct}".encode("utf-8")))
         rows.append(row)
-    rows.append([Button.inline("⬅️ Back", b"menu:main")])
+    rows.append([_btn("⬅️ Back", b"menu:main")])
     return rows
 
 def _wallet_menu():
     return [
-        [Button.inline("💠 Wallet Overview", b"wallet:overview")],
-        [Button.inline("🧰 Manage Wallets", b"wallets:manage")],
-        [Button.inline("🧬 Generate Wallet", b"wallet:generate")],
-        [Button.inline("🔑 Import Wallet", b"wallet:import")],
-        [Button.inline("🕶️ Reveal Key", b"wallet:reveal")],
-        [Button.inline("⬅️ Back", b"menu:main")],
+        [_btn("💠 Wallet Overview", b"wallet:overview")],
+        [_btn("🧰 Manage Wallets", b"wallets:manage")],
+        [_btn("🧬 Generate Wallet", b"wallet:generate")],
+        [_btn("🔑 Import Wallet", b"wallet:import")],
+        [_btn("🕶️ Reveal Key", b"wallet:reveal")],
+        [_btn("⬅️ Back", b"menu:main")],
     ]
 
 def _wallet_list_buttons(user_id: str):
     wallets = wallet_list(user_id)
     if not wallets:
-        return [[Button.inline("⬅️ Back", b"menu:wallet")]]
+        return [[_btn("⬅️ Back", b"menu:wallet")]]
     rows = []
     for w in wallets:
         prefix = "✅ " if w.is_default else ""
         label = f"{prefix}{w.name} {w.pubkey[:6]}..."
         rows.append([Button.inline(label, f"wallet:select:{w.id}".encode("utf-8"))])
-    rows.append([Button.inline("⬅️ Back", b"menu:wallet")])
+    rows.append([_btn("⬅️ Back", b"menu:wallet")])
     return rows
 
 def _wallet_actions_buttons(wallet_id: int):
     return [
         [Button.inline("✅ Set Default", f"wallet:set_default:{wallet_id}".encode("utf-8"))],
         [Button.inline("🕶️ Reveal Key", f"wallet:reveal:{wallet_id}".encode("utf-8"))],
-        [Button.inline("⬅️ Back", b"wallets:manage")],
+        [_btn("⬅️ Back", b"wallets:manage")],
     ]
 
 def _buy_amount_presets(user_id: str, mint: str):
@@ -276,19 +361,19 @@ def _buy_amount_presets(user_id: str, mint: str):
             row.append(Button.inline(label, f"buyamt:{mint}:{sol}".encode("utf-8")))
         rows.append(row)
     rows.append([Button.inline("✍️ Custom", f"buyamt:{mint}:custom".encode("utf-8"))])
-    rows.append([Button.inline("⬅️ Back", b"menu:main")])
+    rows.append([_btn("⬅️ Back", b"menu:main")])
     return rows
 
 def _confirm_buttons(tag: str):
     return [
         [Button.inline("✅ Confirm", f"confirm:{tag}".encode("utf-8"))],
-        [Button.inline("⬅️ Cancel", b"menu:main")],
+        [_btn("⬅️ Cancel", b"menu:main")],
     ]
 
 def _retry_buy_buttons(mint: str, sol: float):
     return [
         [Button.inline("🔁 Retry Buy", f"retry_buy:{mint}:{sol}".encode("utf-8"))],
-        [Button.inline("⬅️ Main Menu", b"menu:main")],
+        [_btn("⬅️ Main Menu", b"menu:main")],
     ]
 
 def _tx_link(sig: str) -> str:
@@ -359,8 +444,8 @@ def _settings_menu(s):
         [Button.inline(degen_label, b"set:degen_toggle")],
         [Button.inline(confirm_label, b"set:confirm_tx_toggle")],
         [Button.inline(auto_label, b"set:auto_buy_toggle"), Button.inline(dup_label, b"set:dup_toggle")],
-        [Button.inline("🛰️ Scraper Settings", b"menu:channels")],
-        [Button.inline("⬅️ Back", b"menu:main")],
+        [_btn("🛰️ Scraper Settings", b"menu:channels")],
+        [_btn("⬅️ Back", b"menu:main")],
     ]
 
 def _channel_settings_menu(handle: str, defaults: dict, overrides: dict):
@@ -397,15 +482,15 @@ def _channel_settings_menu(handle: str, defaults: dict, overrides: dict):
         [Button.inline(degen_label, f"chan_toggle:degen_mode:{handle}".encode("utf-8"))],
         [Button.inline(auto_label, f"chan_toggle:auto_buy_enabled:{handle}".encode("utf-8"))],
         [Button.inline("♻️ Use Defaults", f"chan_reset:{handle}".encode("utf-8"))],
-        [Button.inline("⬅️ Back", b"menu:channels")],
+        [_btn("⬅️ Back", b"menu:channels")],
     ]
 
 def _channels_menu():
     return [
-        [Button.inline("🛰️ List Channels", b"channels:list")],
-        [Button.inline("🧬 Channel Settings", b"channels:settings")],
-        [Button.inline("➕ Add Channel", b"channels:add"), Button.inline("➖ Remove Channel", b"channels:remove")],
-        [Button.inline("⬅️ Back", b"menu:main")],
+        [_btn("🛰️ List Channels", b"channels:list")],
+        [_btn("🧬 Channel Settings", b"channels:settings")],
+        [_btn("➕ Add Channel", b"channels:add"), _btn("➖ Remove Channel", b"channels:remove")],
+        [_btn("⬅️ Back", b"menu:main")],
     ]
 
 
@@ -418,11 +503,29 @@ async def run_bot() -> None:
     token = _get_bot_token()
     session = os.getenv("TELETHON_SESSION", "scrapetech_session").strip() + "_bot"
 
-    client = TelegramClient(session, api_id, api_hash)
+    client = TelegramClient(
+        session,
+        api_id,
+        api_hash,
+        connection_retries=5,
+        retry_delay=2,
+        request_retries=3,
+        flood_sleep_threshold=60,
+    )
     await client.start(bot_token=token)
 
-    pending = {}
-    last_mint = {}
+    async def _keepalive():
+        while True:
+            await asyncio.sleep(300)
+            try:
+                await client.get_me()
+            except Exception:
+                log.warning("Keepalive ping failed", exc_info=True)
+
+    keepalive_task = asyncio.create_task(_keepalive())
+
+    pending = _ExpiringDict(maxsize=10_000, ttl=3600)
+    last_mint = _ExpiringDict(maxsize=50_000, ttl=1800)
     selected_wallet = {}
 
     async def _safe_edit(event, text, buttons=None):
@@ -551,13 +654,7 @@ async def run_bot() -> None:
         if not rows:
             await event.respond("No positions.")
             return
-        lines = []
-        for r in rows:
-            lines.append(
-                f"{r['mint']} | tokens={r['token_balance']} | avg_entry={r['avg_entry_sol']} | "
-                f"pnl={r['realized_pnl_sol']} | open={r['open']}"
-            )
-        await event.respond("\n".join(lines))
+        await event.respond(_positions_text(rows))
 
     @client.on(events.NewMessage(pattern=r"^/buy"))
     async def _buy(event):
@@ -767,7 +864,7 @@ async def run_bot() -> None:
             pending.pop(user_id, None)
             updates = {field: val}
             try:
-                update_user_settings(user_id, updates)
+                await asyncio.to_thread(update_user_settings, user_id, updates)
                 s = get_user_settings(user_id)
                 await event.respond("Settings updated.", buttons=_settings_menu(s))
             except Exception as e:
@@ -791,7 +888,7 @@ async def run_bot() -> None:
                 return
             updates = {field: ",".join([f"{v:g}" for v in presets])}
             try:
-                update_user_settings(user_id, updates)
+                await asyncio.to_thread(update_user_settings, user_id, updates)
                 s = get_user_settings(user_id)
                 await event.respond("Presets updated.", buttons=_settings_menu(s))
             except Exception as e:
@@ -805,14 +902,14 @@ async def run_bot() -> None:
             raw = event.raw_text.strip()
             pending.pop(user_id, None)
             if raw.lower() == "default":
-                upsert_channel_settings(user_id, handle, {field: None})
+                await asyncio.to_thread(upsert_channel_settings, user_id, handle, {field: None})
             else:
                 try:
                     val = float(raw)
                 except Exception:
                     await event.respond("Send a valid number or 'default'.")
                     return
-                upsert_channel_settings(user_id, handle, {field: val})
+                await asyncio.to_thread(upsert_channel_settings, user_id, handle, {field: val})
             defaults = get_user_settings(user_id)
             overrides = get_channel_settings(user_id, handle)
             await event.respond(
@@ -829,7 +926,7 @@ async def run_bot() -> None:
             if not handle.startswith("@"):
                 handle = f"@{handle}"
             pending.pop(user_id, None)
-            upsert_subscription(user_id, handle, "ACTIVE")
+            await asyncio.to_thread(upsert_subscription, user_id, handle, "ACTIVE")
             await event.respond(f"Added subscription: {handle}", buttons=_channels_menu())
             return
 
@@ -841,7 +938,7 @@ async def run_bot() -> None:
             if not handle.startswith("@"):
                 handle = f"@{handle}"
             pending.pop(user_id, None)
-            upsert_subscription(user_id, handle, "DELETED")
+            await asyncio.to_thread(upsert_subscription, user_id, handle, "DELETED")
             await event.respond(f"Removed subscription: {handle}", buttons=_channels_menu())
             return
 
@@ -850,27 +947,31 @@ async def run_bot() -> None:
         s = get_user_settings(user_id)
         sol_in = float(s.get("buy_amount_sol") or 0.0)
         info_lines = [f"MINT: {mint}"]
+        price_value: Optional[float] = None
 
-        try:
-            q = quote_buy_pumpfun(mint, sol_in=sol_in, fee_bps=0)
-            info_lines.append(f"EST TOKENS (for {sol_in} SOL): {q.est_tokens_out_ui:.6f}" if q.est_tokens_out_ui else "")
-            if q.est_price_sol_per_token:
-                info_lines.append(f"PRICE: {q.est_price_sol_per_token:.12f} SOL")
-        except Exception:
-            pass
+        q, mi = await asyncio.gather(
+            asyncio.to_thread(quote_buy_pumpfun, mint, sol_in=sol_in, fee_bps=0),
+            asyncio.to_thread(fetch_mint_info, mint),
+            return_exceptions=True,
+        )
 
-        try:
-            mi = fetch_mint_info(mint)
-            if mi and mi.decimals is not None and mi.supply is not None:
-                supply_ui = mi.supply / (10 ** int(mi.decimals))
-                if "PRICE:" in "\n".join(info_lines):
-                    price_line = next((l for l in info_lines if l.startswith("PRICE:")), None)
-                    if price_line:
-                        price = float(price_line.split(" ")[1])
-                        mcap = price * supply_ui
-                        info_lines.append(f"MCAP (est): {mcap:,.2f} SOL")
-        except Exception:
-            pass
+        if not isinstance(q, BaseException):
+            try:
+                info_lines.append(f"EST TOKENS (for {sol_in} SOL): {q.est_tokens_out_ui:.6f}" if q.est_tokens_out_ui else "")
+                if q.est_price_sol_per_token:
+                    info_lines.append(f"PRICE: {q.est_price_sol_per_token:.12f} SOL")
+                    price_value = float(q.est_price_sol_per_token)
+            except Exception:
+                pass
+
+        if not isinstance(mi, BaseException):
+            try:
+                if price_value is not None and mi and mi.decimals is not None and mi.supply is not None:
+                    supply_ui = mi.supply / (10 ** int(mi.decimals))
+                    mcap = price_value * supply_ui
+                    info_lines.append(f"MCAP (est): {mcap:,.2f} SOL")
+            except Exception:
+                pass
 
         rows = list_positions(user_id)
         has_pos = any(r["mint"] == mint and float(r["token_balance"]) > 0 for r in rows)
@@ -880,18 +981,15 @@ async def run_bot() -> None:
                 [Button.inline("Sell Presets", f"sellpick:{mint}".encode("utf-8"))],
                 *buttons,
             ]
-        buttons.append([Button.inline("Refresh", b"mint:refresh"), Button.inline("Main Menu", b"menu:main")])
+        buttons.append([_btn("Refresh", b"mint:refresh"), _btn("Main Menu", b"menu:main")])
         await event.respond("\n".join([l for l in info_lines if l]), buttons=buttons)
 
-    @client.on(events.CallbackQuery)
-    async def _callbacks(event):
-        user_id = str(event.sender_id)
-        data = event.data.decode("utf-8")
-
-        if data == "menu:main":
+    async def _cb_menu(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "main":
             await event.edit(_main_status_text(user_id), buttons=_main_menu())
             return
-        if data == "menu:wallet":
+        if action == "wallet":
             pub = wallet_get_pubkey(user_id)
             if not pub:
                 await event.edit("💼 Wallet\nNo wallet found.", buttons=_wallet_menu())
@@ -908,11 +1006,67 @@ async def run_bot() -> None:
             text = f"{header}\nSOL: {sol:.6f}"
             await event.edit(text, buttons=_wallet_menu())
             return
-        if data == "wallets:manage":
+        if action == "positions":
+            rows = list_positions(user_id)
+            _reconcile_positions(user_id, rows)
+            rows = list_positions(user_id)
+            if not rows:
+                await _safe_edit(event, "📈 Positions\nNo positions.", buttons=_main_menu())
+                return
+            await _safe_edit(event, "📈 Positions\n" + _positions_text(rows), buttons=_main_menu())
+            return
+        if action == "settings":
+            s = get_user_settings(user_id)
+            await _safe_edit(
+                event,
+                "🧪 Settings (tap a row, then reply with a value when prompted):",
+                buttons=_settings_menu(s),
+            )
+            return
+        if action == "channels":
+            await _safe_edit(event, "🛰️ Channels", buttons=_channels_menu())
+            return
+        if action == "help":
+            await _safe_edit(
+                event,
+                "Scrapetech helps you trade pump tokens from Telegram.\n"
+                "Use Channels to add call groups, then set your auto‑buy settings.\n"
+                "Paste a mint to get a token card with buy/sell buttons and positions.\n"
+                "Wallet lets you generate/import and manage keys safely.",
+                buttons=_main_menu(),
+            )
+            return
+        if action == "buy":
+            pending[user_id] = {"mode": "buy_mint"}
+            await _safe_edit(event, "Buy selected.", buttons=_main_menu())
+            msg = await event.respond("Reply with the mint address to buy:", buttons=Button.force_reply())
+            pending[user_id]["prompt_id"] = msg.id
+            return
+        if action == "sell":
+            rows = list_positions(user_id)
+            open_rows = [r for r in rows if float(r["token_balance"]) > 0]
+            if not open_rows:
+                await _safe_edit(event, "No positions to sell.", buttons=_main_menu())
+                return
+            if len(open_rows) == 1:
+                mint = open_rows[0]["mint"]
+                await _safe_edit(event, f"Sell presets for {mint}:", buttons=_sell_presets(user_id, mint))
+                return
+            buttons = [[Button.inline(r["mint"][:8], f"sellpick:{r['mint']}".encode("utf-8"))] for r in open_rows]
+            buttons.append([_btn("Back", b"menu:main")])
+            await _safe_edit(event, "Select a mint:", buttons=buttons)
+            return
+
+    async def _cb_wallets(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "manage":
             await _safe_edit(event, "🧰 Wallets", buttons=_wallet_list_buttons(user_id))
             return
-        if data.startswith("wallet:select:"):
-            wallet_id = int(data.split(":")[2])
+
+    async def _cb_wallet(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "select":
+            wallet_id = int(args[1])
             wallets = {w.id: w for w in wallet_list(user_id)}
             w = wallets.get(wallet_id)
             if not w:
@@ -922,8 +1076,8 @@ async def run_bot() -> None:
             label = f"{w.name} {w.pubkey}"
             await _safe_edit(event, f"Wallet selected:\n{label}", buttons=_wallet_actions_buttons(wallet_id))
             return
-        if data.startswith("wallet:set_default:"):
-            wallet_id = int(data.split(":")[2])
+        if action == "set_default":
+            wallet_id = int(args[1])
             try:
                 wallet_set_default(user_id, wallet_id)
             except Exception as e:
@@ -931,14 +1085,14 @@ async def run_bot() -> None:
                 return
             await _safe_edit(event, "Default wallet updated.", buttons=_wallet_list_buttons(user_id))
             return
-        if data == "wallet:overview":
+        if action == "overview":
             pub, lines = _wallet_overview_lines(user_id)
             if not pub:
                 await _safe_edit(event, "No wallet found.", buttons=_wallet_menu())
                 return
             await _safe_edit(event, "\n".join(lines), buttons=_wallet_tokens_buttons(user_id))
             return
-        if data == "wallet:generate":
+        if action == "generate":
             await _safe_edit(event, "Generating wallet...", buttons=_wallet_menu())
             try:
                 out = wallet_create(user_id)
@@ -956,17 +1110,16 @@ async def run_bot() -> None:
             except Exception as e:
                 await _safe_edit(event, f"Generate failed: {e}", buttons=_wallet_menu())
             return
-        if data == "wallet:import":
+        if action == "import":
             pending[user_id] = {"mode": "import_wallet"}
             await _safe_edit(event, "Import wallet selected.", buttons=_wallet_menu())
             msg = await event.respond("Reply with the secret key or seed to import:", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data.startswith("wallet:reveal"):
+        if action == "reveal":
             wallet_id = None
-            parts = data.split(":")
-            if len(parts) == 3:
-                wallet_id = int(parts[2])
+            if len(args) == 2:
+                wallet_id = int(args[1])
             if wallet_id is None and not wallet_get_pubkey(user_id):
                 await _safe_edit(event, "No wallet found.", buttons=_wallet_menu())
                 return
@@ -986,220 +1139,166 @@ async def run_bot() -> None:
             entities = [MessageEntitySpoiler(offset=len(header), length=len(secret58))]
             await _safe_edit_entities(event, text, entities, buttons=_wallet_menu())
             return
-        if data.startswith("wallet_sell:"):
-            mint = data.split(":", 1)[1]
-            bal = _get_onchain_token_balance(user_id, mint)
-            bal_line = f"Balance: {bal:.6f}" if bal is not None else "Balance: unknown"
-            await _safe_edit(event, f"Sell presets for {mint}:\n{bal_line}", buttons=_sell_presets(user_id, mint))
-            return
-        if data == "menu:positions":
-            rows = list_positions(user_id)
-            _reconcile_positions(user_id, rows)
-            rows = list_positions(user_id)
-            if not rows:
-                await _safe_edit(event, "📈 Positions\nNo positions.", buttons=_main_menu())
+
+    async def _cb_wallet_sell(event, user_id: str, args: list[str]):
+        mint = args[0]
+        bal = _get_onchain_token_balance(user_id, mint)
+        bal_line = f"Balance: {bal:.6f}" if bal is not None else "Balance: unknown"
+        await _safe_edit(event, f"Sell presets for {mint}:\n{bal_line}", buttons=_sell_presets(user_id, mint))
+
+    async def _cb_mint(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "refresh":
+            mint = last_mint.get(user_id)
+            if not mint:
+                await _safe_edit(event, "No recent mint. Paste a CA.", buttons=_main_menu())
                 return
-            lines = []
-            for r in rows:
-                lines.append(
-                    f"{r['mint']} | tokens={r['token_balance']} | avg_entry={r['avg_entry_sol']} | "
-                    f"pnl={r['realized_pnl_sol']} | open={r['open']}"
-                )
-            await _safe_edit(event, "📈 Positions\n" + "\n".join(lines), buttons=_main_menu())
+            await _send_mint_card(event, user_id, mint)
             return
-        if data == "menu:settings":
-            s = get_user_settings(user_id)
+
+    async def _cb_buyamt(event, user_id: str, args: list[str]):
+        mint, amount = args
+        if amount == "custom":
+            pending[user_id] = {"mode": "buy_amount_custom", "mint": mint}
+            await _safe_edit(event, "Custom amount selected.", buttons=_buy_amount_presets(user_id, mint))
+            msg = await event.respond("Reply with custom SOL amount:", buttons=Button.force_reply())
+            pending[user_id]["prompt_id"] = msg.id
+            return
+        sol = float(amount)
+        s = get_user_settings(user_id)
+        if int(s.get("confirm_tx_enabled", 0)):
             await _safe_edit(
                 event,
-                "🧪 Settings (tap a row, then reply with a value when prompted):",
-                buttons=_settings_menu(s),
+                f"Confirm buy:\nMINT={mint}\nSOL={sol}",
+                buttons=_confirm_buttons(f"buy:{mint}:{sol}"),
             )
             return
-        if data == "menu:channels":
-            await _safe_edit(event, "🛰️ Channels", buttons=_channels_menu())
+        await _safe_edit(event, "Submitting buy...", buttons=_buy_amount_presets(user_id, mint))
+        try:
+            sig, owner_pubkey, mint = await asyncio.to_thread(
+                submit_buy_for_user, user_id, mint, sol
+            )
+            await event.respond(f"Buy submitted: {_tx_link(sig)}")
+            if int(s.get("confirm_tx_enabled", 0)):
+                asyncio.create_task(
+                    _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY")
+                )
+        except Exception as e:
+            await event.respond(
+                f"Buy failed.\nReason: {format_tx_error(e)}",
+                buttons=_retry_buy_buttons(mint, sol),
+            )
+
+    async def _cb_sellpick(event, user_id: str, args: list[str]):
+        mint = args[0]
+        await _safe_edit(event, f"Sell presets for {mint}:", buttons=_sell_presets(user_id, mint))
+
+    async def _cb_sell(event, user_id: str, args: list[str]):
+        mint, pct_s = args
+        pct = float(pct_s)
+        onchain_bal = _get_onchain_token_balance(user_id, mint)
+        if onchain_bal is None:
+            await _safe_edit(event, "Could not fetch on-chain balance.", buttons=_main_menu())
             return
-        if data == "menu:help":
+        if onchain_bal <= 0:
+            await _safe_edit(event, "No position balance found.", buttons=_main_menu())
+            return
+        tokens = float(onchain_bal) * (pct / 100.0)
+        s = get_user_settings(user_id)
+        if int(s.get("confirm_tx_enabled", 0)):
             await _safe_edit(
                 event,
-                "Scrapetech helps you trade pump tokens from Telegram.\n"
-                "Use Channels to add call groups, then set your auto‑buy settings.\n"
-                "Paste a mint to get a token card with buy/sell buttons and positions.\n"
-                "Wallet lets you generate/import and manage keys safely.",
-                buttons=_main_menu(),
+                f"Confirm sell:\nMINT={mint}\nPCT={pct}",
+                buttons=_confirm_buttons(f"sell:{mint}:{pct}"),
             )
+            pending[user_id] = {"mode": "sell_confirm", "mint": mint, "pct": pct}
             return
-        if data == "mint:refresh":
-            mint = last_mint.get(user_id)
-            if not mint:
-                await _safe_edit(event, "No recent mint. Paste a CA.", buttons=_main_menu())
-                return
-            await _send_mint_card(event, user_id, mint)
-            return
-        if data == "menu:buy":
-            pending[user_id] = {"mode": "buy_mint"}
-            await _safe_edit(event, "Buy selected.", buttons=_main_menu())
-            msg = await event.respond("Reply with the mint address to buy:", buttons=Button.force_reply())
-            pending[user_id]["prompt_id"] = msg.id
-            return
-        if data == "menu:sell":
-            rows = list_positions(user_id)
-            open_rows = [r for r in rows if float(r["token_balance"]) > 0]
-            if not open_rows:
-                await _safe_edit(event, "No positions to sell.", buttons=_main_menu())
-                return
-            if len(open_rows) == 1:
-                mint = open_rows[0]["mint"]
-                await _safe_edit(event, f"Sell presets for {mint}:", buttons=_sell_presets(user_id, mint))
-                return
-            buttons = [[Button.inline(r["mint"][:8], f"sellpick:{r['mint']}".encode("utf-8"))] for r in open_rows]
-            buttons.append([Button.inline("Back", b"menu:main")])
-            await _safe_edit(event, "Select a mint:", buttons=buttons)
-            return
-
-        if data.startswith("buyamt:"):
-            _tag, mint, amount = data.split(":")
-            if amount == "custom":
-                pending[user_id] = {"mode": "buy_amount_custom", "mint": mint}
-                await _safe_edit(event, "Custom amount selected.", buttons=_buy_amount_presets(user_id, mint))
-                msg = await event.respond("Reply with custom SOL amount:", buttons=Button.force_reply())
-                pending[user_id]["prompt_id"] = msg.id
-                return
-            sol = float(amount)
-            s = get_user_settings(user_id)
+        await _safe_edit(event, "Submitting sell...", buttons=_main_menu())
+        try:
+            sig, owner_pubkey, mint = await asyncio.to_thread(
+                submit_sell_for_user, user_id, mint, tokens
+            )
+            await event.respond(f"Sell submitted: {_tx_link(sig)}")
             if int(s.get("confirm_tx_enabled", 0)):
-                await _safe_edit(
-                    event,
-                    f"Confirm buy:\nMINT={mint}\nSOL={sol}",
-                    buttons=_confirm_buttons(f"buy:{mint}:{sol}"),
+                asyncio.create_task(
+                    _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "SELL")
                 )
-                return
+        except Exception as e:
+            await event.respond(f"Sell failed.\nReason: {format_tx_error(e)}")
+
+    async def _cb_confirm(event, user_id: str, args: list[str]):
+        action, mint, amt = args
+        if action == "buy":
+            sol = float(amt)
             await _safe_edit(event, "Submitting buy...", buttons=_buy_amount_presets(user_id, mint))
             try:
                 sig, owner_pubkey, mint = await asyncio.to_thread(
                     submit_buy_for_user, user_id, mint, sol
                 )
                 await event.respond(f"Buy submitted: {_tx_link(sig)}")
-                if int(s.get("confirm_tx_enabled", 0)):
-                    asyncio.create_task(
-                        _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY")
-                    )
+                s = get_user_settings(user_id)
+                notify = int(s.get("confirm_tx_enabled", 0)) == 1
+                asyncio.create_task(
+                    _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY", notify)
+                )
             except Exception as e:
                 await event.respond(
                     f"Buy failed.\nReason: {format_tx_error(e)}",
                     buttons=_retry_buy_buttons(mint, sol),
                 )
             return
-
-        if data.startswith("sellpick:"):
-            mint = data.split(":", 1)[1]
-            await _safe_edit(event, f"Sell presets for {mint}:", buttons=_sell_presets(user_id, mint))
-            return
-        if data.startswith("sell:"):
-            _tag, mint, pct_s = data.split(":")
-            pct = float(pct_s)
-            onchain_bal = _get_onchain_token_balance(user_id, mint)
-            if onchain_bal is None:
-                await _safe_edit(event, "Could not fetch on-chain balance.", buttons=_main_menu())
-                return
-            if onchain_bal <= 0:
+        if action == "sell":
+            pct = float(amt)
+            pos = list_positions(user_id)
+            row = next((r for r in pos if r["mint"] == mint), None)
+            if not row or float(row["token_balance"]) <= 0:
                 await _safe_edit(event, "No position balance found.", buttons=_main_menu())
                 return
-            tokens = float(onchain_bal) * (pct / 100.0)
-            s = get_user_settings(user_id)
-            if int(s.get("confirm_tx_enabled", 0)):
-                await _safe_edit(
-                    event,
-                    f"Confirm sell:\nMINT={mint}\nPCT={pct}",
-                    buttons=_confirm_buttons(f"sell:{mint}:{pct}"),
-                )
-                pending[user_id] = {"mode": "sell_confirm", "mint": mint, "pct": pct}
-                return
+            tokens = float(row["token_balance"]) * (pct / 100.0)
             await _safe_edit(event, "Submitting sell...", buttons=_main_menu())
             try:
                 sig, owner_pubkey, mint = await asyncio.to_thread(
                     submit_sell_for_user, user_id, mint, tokens
                 )
                 await event.respond(f"Sell submitted: {_tx_link(sig)}")
-                if int(s.get("confirm_tx_enabled", 0)):
-                    asyncio.create_task(
-                        _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "SELL")
-                    )
-            except Exception as e:
-                await event.respond(f"Sell failed.\nReason: {format_tx_error(e)}")
-            return
-
-        if data.startswith("confirm:"):
-            _tag, action, mint, amt = data.split(":")
-            if action == "buy":
-                sol = float(amt)
-                await _safe_edit(event, "Submitting buy...", buttons=_buy_amount_presets(user_id, mint))
-                try:
-                    sig, owner_pubkey, mint = await asyncio.to_thread(
-                        submit_buy_for_user, user_id, mint, sol
-                    )
-                    await event.respond(f"Buy submitted: {_tx_link(sig)}")
-                    s = get_user_settings(user_id)
-                    notify = int(s.get("confirm_tx_enabled", 0)) == 1
-                    asyncio.create_task(
-                        _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY", notify)
-                    )
-                except Exception as e:
-                    await event.respond(
-                        f"Buy failed.\nReason: {format_tx_error(e)}",
-                        buttons=_retry_buy_buttons(mint, sol),
-                    )
-                return
-            if action == "sell":
-                pct = float(amt)
-                pos = list_positions(user_id)
-                row = next((r for r in pos if r["mint"] == mint), None)
-                if not row or float(row["token_balance"]) <= 0:
-                    await _safe_edit(event, "No position balance found.", buttons=_main_menu())
-                    return
-                tokens = float(row["token_balance"]) * (pct / 100.0)
-                await _safe_edit(event, "Submitting sell...", buttons=_main_menu())
-                try:
-                    sig, owner_pubkey, mint = await asyncio.to_thread(
-                        submit_sell_for_user, user_id, mint, tokens
-                    )
-                    await event.respond(f"Sell submitted: {_tx_link(sig)}")
-                    s = get_user_settings(user_id)
-                    notify = int(s.get("confirm_tx_enabled", 0)) == 1
-                    asyncio.create_task(
-                        _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "SELL", notify)
-                    )
-                except Exception as e:
-                    await event.respond(f"Sell failed.\nReason: {format_tx_error(e)}")
-                return
-
-        if data.startswith("retry_buy:"):
-            _tag, mint, sol_s = data.split(":")
-            sol = float(sol_s)
-            await _safe_edit(event, "Retrying buy...", buttons=_buy_amount_presets(user_id, mint))
-            try:
-                sig, owner_pubkey, mint = await asyncio.to_thread(
-                    submit_buy_for_user, user_id, mint, sol
-                )
-                await event.respond(f"Buy submitted: {_tx_link(sig)}")
                 s = get_user_settings(user_id)
                 notify = int(s.get("confirm_tx_enabled", 0)) == 1
                 asyncio.create_task(
-                    _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY", notify)
+                    _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "SELL", notify)
                 )
             except Exception as e:
-                await event.respond(
-                    f"Buy failed.\nReason: {format_tx_error(e)}",
-                    buttons=_retry_buy_buttons(mint, sol),
-                )
-            return
-        if data == "set:buy_amount":
+                await event.respond(f"Sell failed.\nReason: {format_tx_error(e)}")
+
+    async def _cb_retry_buy(event, user_id: str, args: list[str]):
+        mint, sol_s = args
+        sol = float(sol_s)
+        await _safe_edit(event, "Retrying buy...", buttons=_buy_amount_presets(user_id, mint))
+        try:
+            sig, owner_pubkey, mint = await asyncio.to_thread(
+                submit_buy_for_user, user_id, mint, sol
+            )
+            await event.respond(f"Buy submitted: {_tx_link(sig)}")
+            s = get_user_settings(user_id)
+            notify = int(s.get("confirm_tx_enabled", 0)) == 1
+            asyncio.create_task(
+                _confirm_and_notify(event.chat_id, user_id, mint, owner_pubkey, sig, "BUY", notify)
+            )
+        except Exception as e:
+            await event.respond(
+                f"Buy failed.\nReason: {format_tx_error(e)}",
+                buttons=_retry_buy_buttons(mint, sol),
+            )
+
+    async def _cb_set(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "buy_amount":
             pending[user_id] = {"mode": "setting_value", "field": "buy_amount_sol"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Buy amount selected.", buttons=_settings_menu(s))
             msg = await event.respond("Reply with new buy amount (SOL):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:buy_presets":
+        if action == "buy_presets":
             pending[user_id] = {"mode": "setting_presets", "field": "buy_presets_sol"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Buy presets selected.", buttons=_settings_menu(s))
@@ -1209,7 +1308,7 @@ async def run_bot() -> None:
             )
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:sell_presets":
+        if action == "sell_presets":
             pending[user_id] = {"mode": "setting_presets", "field": "sell_presets_pct"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Sell presets selected.", buttons=_settings_menu(s))
@@ -1219,159 +1318,70 @@ async def run_bot() -> None:
             )
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:buy_slippage":
+        if action == "buy_slippage":
             pending[user_id] = {"mode": "setting_value", "field": "buy_slippage_pct"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Buy slippage selected.", buttons=_settings_menu(s))
             msg = await event.respond("Reply with new buy slippage (%):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:sell_slippage":
+        if action == "sell_slippage":
             pending[user_id] = {"mode": "setting_value", "field": "sell_slippage_pct"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Sell slippage selected.", buttons=_settings_menu(s))
             msg = await event.respond("Reply with new sell slippage (%):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:gas_fee":
+        if action == "gas_fee":
             pending[user_id] = {"mode": "setting_value", "field": "gas_fee_sol"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Gas fee selected.", buttons=_settings_menu(s))
             msg = await event.respond("Reply with new gas fee (SOL):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:tp_sl_toggle":
+        if action == "tp_sl_toggle":
             s = get_user_settings(user_id)
             new_val = 0 if int(s.get("tp_sl_enabled", 1)) else 1
-            update_user_settings(user_id, {"tp_sl_enabled": new_val})
+            await asyncio.to_thread(update_user_settings, user_id, {"tp_sl_enabled": new_val})
             s = get_user_settings(user_id)
             await _safe_edit(event, f"TP/SL enabled={new_val}", buttons=_settings_menu(s))
             return
-        if data == "set:auto_buy_toggle":
+        if action == "auto_buy_toggle":
             s = get_user_settings(user_id)
             new_val = 0 if int(s.get("auto_buy_enabled", 1)) else 1
-            update_user_settings(user_id, {"auto_buy_enabled": new_val})
+            await asyncio.to_thread(update_user_settings, user_id, {"auto_buy_enabled": new_val})
             s = get_user_settings(user_id)
             await _safe_edit(event, f"Auto buy enabled={new_val}", buttons=_settings_menu(s))
             return
-        if data == "set:confirm_tx_toggle":
+        if action == "confirm_tx_toggle":
             s = get_user_settings(user_id)
             new_val = 0 if int(s.get("confirm_tx_enabled", 0)) else 1
-            update_user_settings(user_id, {"confirm_tx_enabled": new_val})
+            await asyncio.to_thread(update_user_settings, user_id, {"confirm_tx_enabled": new_val})
             s = get_user_settings(user_id)
             await _safe_edit(event, f"Confirm tx enabled={new_val}", buttons=_settings_menu(s))
             return
-        if data == "set:degen_toggle":
+        if action == "degen_toggle":
             s = get_user_settings(user_id)
             new_val = 0 if int(s.get("degen_mode", 0)) else 1
-            update_user_settings(user_id, {"degen_mode": new_val})
+            await asyncio.to_thread(update_user_settings, user_id, {"degen_mode": new_val})
             s = get_user_settings(user_id)
             await _safe_edit(event, f"Degen mode enabled={new_val}", buttons=_settings_menu(s))
             return
-        if data == "set:dup_toggle":
+        if action == "dup_toggle":
             s = get_user_settings(user_id)
             new_val = 0 if int(s.get("duplicate_mint_block", 1)) else 1
-            update_user_settings(user_id, {"duplicate_mint_block": new_val})
+            await asyncio.to_thread(update_user_settings, user_id, {"duplicate_mint_block": new_val})
             s = get_user_settings(user_id)
             await _safe_edit(event, f"Duplicate block={new_val}", buttons=_settings_menu(s))
             return
-
-        if data == "channels:settings":
-            rows = list_subscriptions(user_id)
-            if not rows:
-                await _safe_edit(event, "No subscriptions found.", buttons=_channels_menu())
-                return
-            buttons = [
-                [Button.inline(r["handle"], f"chan_menu:{r['handle']}".encode("utf-8"))]
-                for r in rows
-            ]
-            buttons.append([Button.inline("Back", b"menu:channels")])
-            await _safe_edit(event, "Select a channel:", buttons=buttons)
-            return
-
-        if data.startswith("chan_pause:"):
-            handle = data.split(":", 1)[1]
-            upsert_subscription(user_id, handle, "PAUSED")
-            await _safe_edit(event, f"Paused {handle}", buttons=_channels_menu())
-            return
-
-        if data.startswith("chan_resume:"):
-            handle = data.split(":", 1)[1]
-            upsert_subscription(user_id, handle, "ACTIVE")
-            await _safe_edit(event, f"Resumed {handle}", buttons=_channels_menu())
-            return
-
-        if data.startswith("chan_remove:"):
-            handle = data.split(":", 1)[1]
-            upsert_subscription(user_id, handle, "DELETED")
-            await _safe_edit(event, f"Removed {handle}", buttons=_channels_menu())
-            return
-
-        if data.startswith("chan_menu:"):
-            handle = data.split(":", 1)[1]
-            defaults = get_user_settings(user_id)
-            overrides = get_channel_settings(user_id, handle)
-            buttons = _channel_settings_menu(handle, defaults, overrides)
-            buttons.insert(0, [Button.inline("Pause", f"chan_pause:{handle}".encode("utf-8"))])
-            buttons.insert(1, [Button.inline("Resume", f"chan_resume:{handle}".encode("utf-8"))])
-            buttons.insert(2, [Button.inline("Remove", f"chan_remove:{handle}".encode("utf-8"))])
-            await _safe_edit(
-                event,
-                f"Channel settings for {handle}:",
-                buttons=buttons,
-            )
-            return
-
-        if data.startswith("chan_set:"):
-            _tag, field, handle = data.split(":", 2)
-            pending[user_id] = {"mode": "channel_setting_value", "field": field, "handle": handle}
-            defaults = get_user_settings(user_id)
-            overrides = get_channel_settings(user_id, handle)
-            await _safe_edit(
-                event,
-                f"Set {field} for {handle}:",
-                buttons=_channel_settings_menu(handle, defaults, overrides),
-            )
-            msg = await event.respond("Reply with a value (or 'default' to clear override):", buttons=Button.force_reply())
-            pending[user_id]["prompt_id"] = msg.id
-            return
-
-        if data.startswith("chan_toggle:"):
-            _tag, field, handle = data.split(":", 2)
-            defaults = get_user_settings(user_id)
-            overrides = get_channel_settings(user_id, handle)
-            cur = overrides.get(field)
-            if cur is None:
-                cur = defaults.get(field)
-            new_val = 0 if int(cur or 0) else 1
-            upsert_channel_settings(user_id, handle, {field: new_val})
-            overrides = get_channel_settings(user_id, handle)
-            await _safe_edit(
-                event,
-                f"{field}={new_val} for {handle}",
-                buttons=_channel_settings_menu(handle, defaults, overrides),
-            )
-            return
-
-        if data.startswith("chan_reset:"):
-            handle = data.split(":", 1)[1]
-            clear_channel_settings(user_id, handle)
-            defaults = get_user_settings(user_id)
-            overrides = get_channel_settings(user_id, handle)
-            await _safe_edit(
-                event,
-                f"Overrides cleared for {handle}",
-                buttons=_channel_settings_menu(handle, defaults, overrides),
-            )
-            return
-        if data == "set:take_profit":
+        if action == "take_profit":
             pending[user_id] = {"mode": "setting_value", "field": "take_profit_pct"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Take profit selected.", buttons=_settings_menu(s))
             msg = await event.respond("Reply with take profit (%):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "set:stop_loss":
+        if action == "stop_loss":
             pending[user_id] = {"mode": "setting_value", "field": "stop_loss_pct"}
             s = get_user_settings(user_id)
             await _safe_edit(event, "Stop loss selected.", buttons=_settings_menu(s))
@@ -1379,7 +1389,22 @@ async def run_bot() -> None:
             pending[user_id]["prompt_id"] = msg.id
             return
 
-        if data == "channels:list":
+    async def _cb_channels(event, user_id: str, args: list[str]):
+        action = args[0] if args else ""
+        if action == "settings":
+            # Telegram caps an inline keyboard at 100 buttons (one is Back).
+            rows = list_subscriptions(user_id, limit=99)
+            if not rows:
+                await _safe_edit(event, "No subscriptions found.", buttons=_channels_menu())
+                return
+            buttons = [
+                [Button.inline(r["handle"], f"chan_menu:{r['handle']}".encode("utf-8"))]
+                for r in rows
+            ]
+            buttons.append([_btn("Back", b"menu:channels")])
+            await _safe_edit(event, "Select a channel:", buttons=buttons)
+            return
+        if action == "list":
             rows = list_subscriptions(user_id)
             last_seen = get_listener_last_seen()
             status_line = "Listener: unknown"
@@ -1388,17 +1413,18 @@ async def run_bot() -> None:
             if not rows:
                 await _safe_edit(event, f"{status_line}\nNo subscriptions found.", buttons=_channels_menu())
                 return
-            lines = [status_line]
-            lines.extend([f"{r['handle']} | {r['status']} | {r['created_at']}" for r in rows])
-            await _safe_edit(event, "\n".join(lines), buttons=_channels_menu())
+            text = status_line + "\n" + "\n".join(
+                f"{r['handle']} | {r['status']} | {r['created_at']}" for r in rows
+            )
+            await _safe_edit(event, text, buttons=_channels_menu())
             return
-        if data == "channels:add":
+        if action == "add":
             pending[user_id] = {"mode": "channels_add"}
             await _safe_edit(event, "Add channel selected.", buttons=_channels_menu())
             msg = await event.respond("Reply with a channel handle to add (e.g., @example):", buttons=Button.force_reply())
             pending[user_id]["prompt_id"] = msg.id
             return
-        if data == "channels:remove":
+        if action == "remove":
             pending[user_id] = {"mode": "channels_remove"}
             await _safe_edit(event, "Remove channel selected.", buttons=_channels_menu())
             rows = list_subscriptions(user_id)
@@ -1411,4 +1437,106 @@ async def run_bot() -> None:
             pending[user_id]["prompt_id"] = msg.id
             return
 
-    await client.run_until_disconnected()
+    async def _cb_chan_pause(event, user_id: str, args: list[str]):
+        handle = args[0]
+        await asyncio.to_thread(upsert_subscription, user_id, handle, "PAUSED")
+        await _safe_edit(event, f"Paused {handle}", buttons=_channels_menu())
+
+    async def _cb_chan_resume(event, user_id: str, args: list[str]):
+        handle = args[0]
+        await asyncio.to_thread(upsert_subscription, user_id, handle, "ACTIVE")
+        await _safe_edit(event, f"Resumed {handle}", buttons=_channels_menu())
+
+    async def _cb_chan_remove(event, user_id: str, args: list[str]):
+        handle = args[0]
+        await asyncio.to_thread(upsert_subscription, user_id, handle, "DELETED")
+        await _safe_edit(event, f"Removed {handle}", buttons=_channels_menu())
+
+    async def _cb_chan_menu(event, user_id: str, args: list[str]):
+        handle = args[0]
+        defaults = get_user_settings(user_id)
+        overrides = get_channel_settings(user_id, handle)
+        buttons = _channel_settings_menu(handle, defaults, overrides)
+        buttons.insert(0, [Button.inline("Pause", f"chan_pause:{handle}".encode("utf-8"))])
+        buttons.insert(1, [Button.inline("Resume", f"chan_resume:{handle}".encode("utf-8"))])
+        buttons.insert(2, [Button.inline("Remove", f"chan_remove:{handle}".encode("utf-8"))])
+        await _safe_edit(
+            event,
+            f"Channel settings for {handle}:",
+            buttons=buttons,
+        )
+
+    async def _cb_chan_set(event, user_id: str, args: list[str]):
+        field, handle = args
+        pending[user_id] = {"mode": "channel_setting_value", "field": field, "handle": handle}
+        defaults = get_user_settings(user_id)
+        overrides = get_channel_settings(user_id, handle)
+        await _safe_edit(
+            event,
+            f"Set {field} for {handle}:",
+            buttons=_channel_settings_menu(handle, defaults, overrides),
+        )
+        msg = await event.respond("Reply with a value (or 'default' to clear override):", buttons=Button.force_reply())
+        pending[user_id]["prompt_id"] = msg.id
+
+    async def _cb_chan_toggle(event, user_id: str, args: list[str]):
+        field, handle = args
+        defaults = get_user_settings(user_id)
+        overrides = get_channel_settings(user_id, handle)
+        cur = overrides.get(field)
+        if cur is None:
+            cur = defaults.get(field)
+        new_val = 0 if int(cur or 0) else 1
+        await asyncio.to_thread(upsert_channel_settings, user_id, handle, {field: new_val})
+        overrides = get_channel_settings(user_id, handle)
+        await _safe_edit(
+            event,
+            f"{field}={new_val} for {handle}",
+            buttons=_channel_settings_menu(handle, defaults, overrides),
+        )
+
+    async def _cb_chan_reset(event, user_id: str, args: list[str]):
+        handle = args[0]
+        await asyncio.to_thread(clear_channel_settings, user_id, handle)
+        defaults = get_user_settings(user_id)
+        overrides = get_channel_settings(user_id, handle)
+        await _safe_edit(
+            event,
+            f"Overrides cleared for {handle}",
+            buttons=_channel_settings_menu(handle, defaults, overrides),
+        )
+
+    cb_handlers = {
+        "menu": _cb_menu,
+        "wallets": _cb_wallets,
+        "wallet": _cb_wallet,
+        "wallet_sell": _cb_wallet_sell,
+        "mint": _cb_mint,
+        "buyamt": _cb_buyamt,
+        "sellpick": _cb_sellpick,
+        "sell": _cb_sell,
+        "confirm": _cb_confirm,
+        "retry_buy": _cb_retry_buy,
+        "set": _cb_set,
+        "channels": _cb_channels,
+        "chan_pause": _cb_chan_pause,
+        "chan_resume": _cb_chan_resume,
+        "chan_remove": _cb_chan_remove,
+        "chan_menu": _cb_chan_menu,
+        "chan_set": _cb_chan_set,
+        "chan_toggle": _cb_chan_toggle,
+        "chan_reset": _cb_chan_reset,
+    }
+
+    @client.on(events.CallbackQuery)
+    async def _callbacks(event):
+        user_id = str(event.sender_id)
+        parts = event.data.decode("utf-8").split(":")
+        handler = cb_handlers.get(parts[0])
+        if handler is not None:
+            await handler(event, user_id, parts[1:])
+
+    try:
+        await client.run_until_disconnected()
+    finally:
+        keepalive_task.cancel()
@@ -1,51 +1,67 @@
-from solders.pubkey import Pubkey
 import argparse
-import asyncio
+import logging
 import os
+import sys
+import time
+from functools import lru_cache
 
 from .logging_setup import setup_logging
-from .telethon_listener import run_listen
 
 from .db import (
-    init_db, smoke, connect,
+    init_db, smoke, connect_read,
     upsert_subscription, list_subscriptions,
     update_user_settings, get_user_settings,
     tail_trade_intents,
-    apply_trade, get_position, list_positions,
+    apply_trade, apply_trade_and_finalize, get_position, list_positions,
     enqueue_pending_trade, update_pending_trade_status, list_pending_trades, get_telegram_user_id,
 )
 
-from .wallets import wallet_create, wallet_import, wallet_get_pubkey
-from .trade import build_buy_plan, print_buy_plan
-
-# Pump.fun quoting + tx building/sim
-from .pump_quotes import quote_buy_pumpfun
-from .pump_tx import (
-    load_keypair_for_user,
-    build_buy_ix_and_plan,
-    build_and_simulate_buy_tx,
-    send_buy_tx,
-    dump_ix_accounts,
-)
-import time
+log = logging.getLogger("scrapetech.cli")
+
+# Last N signals, oldest first.
+_TAIL_SQL = """
+SELECT * FROM (
+    SELECT s.id, c.handle, s.mint, s.confidence, s.created_at
+    FROM signals s
+    JOIN channels c ON c.id = s.channel_id
+    ORDER BY s.id DESC
+    LIMIT ?
+) ORDER BY id ASC
+"""
+
+# Every user table's columns in one statement (pragma_table_info as a table-valued function).
+_SCHEMA_SQL = """
+SELECT m.name AS table_name, p.name, p.type, p.pk
+FROM sqlite_master m
+JOIN pragma_table_info(m.name) p
+WHERE m.type='table' AND m.name NOT LIKE 'sqlite_%'
+ORDER BY m.name, p.cid
+"""
+
+
+def _write_lines(lines) -> None:
+    # One write for the whole listing instead of a print() per row.
+    out = "\n".join(lines)
+    if out:
+        sys.stdout.write(out + "\n")
+
+
+def _add_listen(p_listen):
+    p_listen.add_argument("--channel")
+    p_listen.add_argument("--log-level", default="INFO")
 
-from .pump_sell import build_sell_ix_and_plan, build_and_simulate_sell_tx, send_sell_tx
-from .solana_rpc import try_get_mint_decimals, rpc_get_transaction, extract_tx_deltas, get_http_client
-from .auto_trader import monitor_positions_loop
-from .bot import run_bot
 
+def _run_listen(args):
+    import asyncio
+    from .telethon_listener import run_listen
 
-def main():
-    parser = argparse.ArgumentParser("scrapetech")
-    sub = parser.add_subparsers(dest="command", required=False)
+    channel = args.channel or os.getenv("TEST_CHANNEL")
+    if not channel:
+        raise SystemExit("Provide --channel or set TEST_CHANNEL")
+    asyncio.run(run_listen(channel))
 
-    # listen
-    p_listen = sub.add_parser("listen", help="Listen to a Telegram channel")
-    p_listen.add_argument("--channel")
-    p_listen.add_argument("--log-level", default="INFO")
 
-    # db
-    p_db = sub.add_parser("db", help="Database utilities")
+def _add_db(p_db):
     db_sub = p_db.add_subparsers(dest="dbcmd", required=True)
     db_sub.add_parser("init")
     db_sub.add_parser("smoke")
@@ -53,8 +69,37 @@ def main():
     tail = db_sub.add_parser("tail", help="Show last N signals")
     tail.add_argument("-n", type=int, default=10)
 
-    # subscriptions
-    p_sub = sub.add_parser("sub", help="Subscription utilities (CLI testing)")
+
+def _run_db(args):
+    if args.dbcmd == "init":
+        init_db()
+        print("DB INIT OK")
+        return
+    if args.dbcmd == "smoke":
+        smoke()
+        return
+    if args.dbcmd == "schema":
+        with connect_read() as conn:
+            lines: list[str] = []
+            current = None
+            for c in conn.execute(_SCHEMA_SQL):
+                if c["table_name"] != current:
+                    current = c["table_name"]
+                    lines.append(f"\n{current}:")
+                pk = " PRIMARY KEY" if c["pk"] else ""
+                lines.append(f"  - {c['name']} {c['type']}{pk}")
+        _write_lines(lines)
+        return
+    if args.dbcmd == "tail":
+        with connect_read() as conn:
+            _write_lines(
+                f"{r['id']} | {r['created_at']} | {r['handle']} | {r['mint']} | conf={r['confidence']}"
+                for r in conn.execute(_TAIL_SQL, (args.n,))
+            )
+        return
+
+
+def _add_sub(p_sub):
     sub_sub = p_sub.add_subparsers(dest="subcmd", required=True)
     sset = sub_sub.add_parser("set", help="Set subscription status for a user+channel")
     sset.add_argument("--user", required=True)
@@ -63,8 +108,22 @@ def main():
     sls = sub_sub.add_parser("list", help="List subscriptions for a user")
     sls.add_argument("--user", required=True)
 
-    # settings
-    p_set = sub.add_parser("settings", help="User settings (CLI testing)")
+
+def _run_sub(args):
+    if args.subcmd == "set":
+        upsert_subscription(args.user, args.channel, args.status)
+        print(f"SUB OK: user={args.user} channel={args.channel} status={args.status}")
+        return
+    if args.subcmd == "list":
+        rows = list_subscriptions(args.user)
+        if not rows:
+            print("No subscriptions found.")
+            return
+        _write_lines(f"{r['handle']} | {r['status']} | {r['created_at']}" for r in rows)
+        return
+
+
+def _add_settings(p_set):
     set_sub = p_set.add_subparsers(dest="setcmd", required=True)
     set_show = set_sub.add_parser("show")
     set_show.add_argument("--user", required=True)
@@ -83,28 +142,245 @@ def main():
     set_update.add_argument("--max-trades-per-day", type=int)
     set_update.add_argument("--duplicate-mint-block", choices=["0", "1"])
 
-    # intents
-    p_int = sub.add_parser("intents", help="Trade intents (CLI testing)")
+
+def _run_settings(args):
+    if args.setcmd == "show":
+        s = get_user_settings(args.user)
+        _write_lines(f"{k}={s[k]}" for k in sorted(s))
+        return
+
+    if args.setcmd == "set":
+        updates = {}
+        if args.trade_mode is not None:
+            updates["trade_mode"] = args.trade_mode
+        if args.position_mode is not None:
+            updates["position_mode"] = args.position_mode
+        if args.max_open_positions is not None:
+            updates["max_open_positions"] = args.max_open_positions
+        if args.buy_amount_sol is not None:
+            updates["buy_amount_sol"] = args.buy_amount_sol
+        if args.buy_slippage_pct is not None:
+            updates["buy_slippage_pct"] = args.buy_slippage_pct
+        if args.sell_slippage_pct is not None:
+            updates["sell_slippage_pct"] = args.sell_slippage_pct
+        if args.tp_sl_enabled is not None:
+            updates["tp_sl_enabled"] = int(args.tp_sl_enabled)
+        if args.take_profit_pct is not None:
+            updates["take_profit_pct"] = args.take_profit_pct
+        if args.stop_loss_pct is not None:
+            updates["stop_loss_pct"] = args.stop_loss_pct
+        if args.cooldown_seconds is not None:
+            updates["cooldown_seconds"] = args.cooldown_seconds
+        if args.max_trades_per_day is not None:
+            updates["max_trades_per_day"] = args.max_trades_per_day
+        if args.duplicate_mint_block is not None:
+            updates["duplicate_mint_block"] = int(args.duplicate_mint_block)
+
+        if not updates:
+            print("No updates provided.")
+            return
+
+        update_user_settings(args.user, updates)
+        print("SETTINGS OK")
+        return
+
+
+def _add_intents(p_int):
     int_sub = p_int.add_subparsers(dest="intcmd", required=True)
     int_tail = int_sub.add_parser("tail")
     int_tail.add_argument("-n", type=int, default=20)
 
-    # reconcile
-    p_rec = sub.add_parser("reconcile", help="Reconcile pending trades")
+
+def _run_intents(args):
+    if args.intcmd == "tail":
+        rows = tail_trade_intents(args.n)
+        if not rows:
+            print("No intents found.")
+            return
+        _write_lines(
+            f"{r['id']} | {r['created_at']} | user={r['telegram_user_id']} | {r['handle']} | "
+            f"{r['intent_type']} | {r['mint']} | {r['status']} | {r['reason'] or ''}"
+            for r in rows
+        )
+        return
+
+
+def _add_reconcile(p_rec):
     p_rec.add_argument("--limit", type=int, default=20)
     p_rec.add_argument("--status", default="PENDING")
     p_rec.add_argument("--watch", action="store_true", help="Loop and reconcile periodically")
     p_rec.add_argument("--interval", type=int, default=10, help="Seconds between reconcile runs")
+    p_rec.add_argument("--concurrency", type=int, default=4, help="Trades settled in parallel per run")
+
+
+async def _reconcile(args):
+    import asyncio
+    from .solana_rpc import rpc_get_signature_statuses, rpc_get_transactions, extract_tx_deltas, get_http_client
+    from .wallets import wallet_get_pubkey
+
+    status = args.status.strip().upper() if args.status else None
+    if status in ("ALL", "*"):
+        status = None
+
+    http = get_http_client()
 
-    # monitor
-    p_mon = sub.add_parser("monitor", help="Monitor positions for TP/SL and auto-sell")
+    def _settle(r, tx, tg_cache: dict, pub_cache: dict):
+        sig = r["signature"]
+        if not tx or not tx.get("meta"):
+            return
+
+        meta = tx.get("meta") or {}
+        if meta.get("err"):
+            update_pending_trade_status(sig, "FAILED", error=str(meta.get("err")))
+            print(f"FAILED {sig} err={meta.get('err')}")
+            return
+
+        # Pending trades cluster on a few users; look each one up once per tick.
+        if r["user_id"] not in tg_cache:
+            tg_cache[r["user_id"]] = get_telegram_user_id(r["user_id"])
+        telegram_user_id = tg_cache[r["user_id"]]
+        if not telegram_user_id:
+            update_pending_trade_status(sig, "FAILED", error="user not found")
+            print(f"FAILED {sig} err=user not found")
+            return
+
+        if telegram_user_id not in pub_cache:
+            pub_cache[telegram_user_id] = wallet_get_pubkey(telegram_user_id)
+        owner_pubkey = pub_cache[telegram_user_id]
+        if not owner_pubkey:
+            update_pending_trade_status(sig, "FAILED", error="wallet not found")
+            print(f"FAILED {sig} err=wallet not found")
+            return
+
+        deltas = extract_tx_deltas(tx, owner_pubkey=owner_pubkey, mint=r["mint"])
+        sol_delta = deltas.get("sol_delta_lamports")
+        token_delta_ui = deltas.get("token_delta_ui")
+        if sol_delta is None or token_delta_ui is None:
+            return
+
+        actual_sol = abs(sol_delta) / 1_000_000_000
+        actual_tokens = abs(token_delta_ui)
+        apply_trade_and_finalize(telegram_user_id, r["mint"], r["side"], actual_tokens, actual_sol, sig)
+        print(f"OK {sig} tokens={actual_tokens} sol={actual_sol}")
+
+    async def _run_once():
+        rows = await asyncio.to_thread(list_pending_trades, status=status, limit=args.limit)
+        if not rows:
+            print("No pending trades.")
+            return
+
+        # One status call for every signature, then batched getTransaction calls
+        # (one per signature if the provider rejects batches) for the ones that
+        # have landed; the rest are retried on the next run.
+        statuses = await asyncio.to_thread(rpc_get_signature_statuses, http, [r["signature"] for r in rows])
+        ready = [
+            r for r, st in zip(rows, statuses)
+            if st and (st.get("err") or st.get("confirmationStatus") == "finalized")
+        ]
+        txs = await asyncio.to_thread(rpc_get_transactions, http, [r["signature"] for r in ready])
+
+        # Trades on the same (user, mint) must settle in created_at order (a SELL
+        # needs its BUY applied first); only independent groups run side by side.
+        groups: dict[tuple, list] = {}
+        for r, tx in zip(ready, txs):
+            groups.setdefault((r["user_id"], r["mint"]), []).append((r, tx))
+
+        sem = asyncio.Semaphore(max(1, args.concurrency))
+        tg_cache: dict[int, str | None] = {}
+        pub_cache: dict[str, str | None] = {}
+
+        async def _process(items):
+            async with sem:
+                for r, tx in items:
+                    try:
+                        await asyncio.to_thread(_settle, r, tx, tg_cache, pub_cache)
+                    except Exception:
+                        log.exception("Reconcile failed for %s", r["signature"])
+
+        await asyncio.gather(*(_process(items) for items in groups.values()))
+
+    async def _watch():
+        # Anchor ticks to the monotonic clock so a slow run doesn't push every
+        # later tick back by its own duration.
+        interval = max(1, int(args.interval))
+        next_tick = time.monotonic()
+        while True:
+            try:
+                await _run_once()
+            except Exception:
+                # An RPC hiccup must not take the daemon (and the bot) down with it.
+                log.exception("Reconcile tick failed")
+            next_tick += interval
+            now = time.monotonic()
+            if next_tick < now:
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+
+    if args.watch:
+        await _watch()
+    else:
+        await _run_once()
+
+
+def _run_reconcile(args):
+    import asyncio
+
+    asyncio.run(_reconcile(args))
+
+
+def _add_monitor(p_mon):
     p_mon.add_argument("--interval", type=int, default=10)
 
-    # bot
-    sub.add_parser("bot", help="Run Telegram bot commands (user-facing)")
 
-    # positions
-    p_pos = sub.add_parser("pos", help="Position utilities (CLI testing)")
+def _run_monitor(args):
+    from .auto_trader import monitor_positions_loop
+
+    print(f"Monitor started (interval={args.interval}s)")
+    monitor_positions_loop(interval=args.interval)
+
+
+def _add_daemon(p_d):
+    p_d.add_argument("--monitor-interval", type=int, default=10)
+    p_d.add_argument("--reconcile-interval", type=int, default=10)
+    p_d.add_argument("--limit", type=int, default=20)
+    p_d.add_argument("--concurrency", type=int, default=4)
+
+
+def _run_daemon(args):
+    import asyncio
+    from .auto_trader import monitor_positions_loop_async
+    from .bot import run_bot
+
+    reconcile_args = argparse.Namespace(
+        status="PENDING",
+        limit=args.limit,
+        watch=True,
+        interval=args.reconcile_interval,
+        concurrency=args.concurrency,
+    )
+
+    async def _daemon():
+        # One event loop, one process-wide HTTP client and SQLite pool for all three.
+        await asyncio.gather(
+            run_bot(),
+            monitor_positions_loop_async(interval=args.monitor_interval),
+            _reconcile(reconcile_args),
+        )
+
+    print(
+        f"Daemon started (monitor={args.monitor_interval}s reconcile={args.reconcile_interval}s)"
+    )
+    asyncio.run(_daemon())
+
+
+def _run_bot(args):
+    import asyncio
+    from .bot import run_bot
+
+    asyncio.run(run_bot())
+
+
+def _add_pos(p_pos):
     pos_sub = p_pos.add_subparsers(dest="poscmd", required=True)
     pos_show = pos_sub.add_parser("show")
     pos_show.add_argument("--user", required=True)
@@ -117,8 +393,47 @@ def main():
     pos_apply.add_argument("--sol", required=True, type=float)
     pos_apply.add_argument("--tx", default=None)
 
-    # wallets
-    p_w = sub.add_parser("wallet", help="Wallet utilities (CLI testing)")
+
+def _position_line(row) -> str:
+    return (
+        f"{row['mint']} | tokens={row['token_balance']} | avg_entry={row['avg_entry_sol']} | "
+        f"spent={row['total_sol_spent']} | received={row['total_sol_received']} | "
+        f"realized_pnl={row['realized_pnl_sol']} | open={row['open']}"
+    )
+
+
+def _run_pos(args):
+    if args.poscmd == "show":
+        if args.mint:
+            row = get_position(args.user, args.mint)
+            if not row:
+                print("No position found.")
+                return
+            print(_position_line(row))
+            return
+        rows = list_positions(args.user)
+        if not rows:
+            print("No positions found.")
+            return
+        _write_lines(_position_line(row) for row in rows)
+        return
+    if args.poscmd == "apply":
+        row = apply_trade(
+            args.user,
+            args.mint,
+            args.side,
+            args.tokens,
+            args.sol,
+            tx_sig=args.tx,
+        )
+        if not row:
+            print("No position found.")
+            return
+        print(_position_line(row))
+        return
+
+
+def _add_wallet(p_w):
     w_sub = p_w.add_subparsers(dest="wcmd", required=True)
     w_create = w_sub.add_parser("create")
     w_create.add_argument("--user", required=True)
@@ -128,726 +443,558 @@ def main():
     w_show = w_sub.add_parser("show")
     w_show.add_argument("--user", required=True)
 
-    # trade (dry-run plan)
-    p_t = sub.add_parser("trade", help="Manual trading (dry-run plan)")
-    t_sub = p_t.add_subparsers(dest="tcmd", required=True)
-    t_buy = t_sub.add_parser("buy", help="Build a buy plan (dry-run)")
-    t_buy.add_argument("--user", required=True)
-    t_buy.add_argument("--mint", required=True)
-
-    # exec (pumpfun)
-    p_e = sub.add_parser("exec", help="Pump.fun execution (quote/build/sim/dump)")
-    e_sub = p_e.add_subparsers(dest="ecmd", required=True)
 
-    e_quote_buy = e_sub.add_parser("quote-buy", help="Quote a buy (no tx sent)")
-    e_quote_buy.add_argument("--user", required=True)
-    e_quote_buy.add_argument("--mint", required=True)
-    e_quote_buy.add_argument("--sol", type=float, default=None)
-
-    e_build_buy = e_sub.add_parser("build-buy", help="Build Pump.fun buy instruction (no tx)")
-    e_build_buy.add_argument("--user", required=True)
-    e_build_buy.add_argument("--mint", required=True)
-    e_build_buy.add_argument("--sol", type=float, default=None)
-    e_build_buy.add_argument("--slippage", type=float, default=None)
-
-    e_sim_buytx = e_sub.add_parser("simulate-buytx", help="Simulate Pump.fun buy tx (no send)")
-
-    e_send_buy = e_sub.add_parser("send-buy", help="SEND Pump.fun buy tx (REAL TX)")
-    e_send_buy.add_argument("--user", required=True)
-    e_send_buy.add_argument("--mint", required=True)
-    e_send_buy.add_argument("--sol", type=float, default=None)
-    e_send_buy.add_argument("--slippage", type=float, default=None)
-    e_sim_buytx.add_argument("--user", required=True)
-    e_sim_buytx.add_argument("--mint", required=True)
-    e_sim_buytx.add_argument("--sol", type=float, default=None)
-    e_sim_buytx.add_argument("--slippage", type=float, default=None)
-
-    e_dump_buytx = e_sub.add_parser("dump-buytx", help="Dump tx account order + existence")
-    e_dump_buytx.add_argument("--user", required=True)
-    e_dump_buytx.add_argument("--mint", required=True)
-    e_dump_buytx.add_argument("--sol", type=float, default=None)
-    e_dump_buytx.add_argument("--slippage", type=float, default=None)
+def _run_wallet(args):
+    from .wallets import wallet_create, wallet_import, wallet_get_pubkey
 
-    # sell (pumpfun)
-    e_build_sell = e_sub.add_parser("build-sell", help="Build Pump.fun sell instruction (no tx)")
-    e_build_sell.add_argument("--user", required=True)
-    e_build_sell.add_argument("--mint", required=True)
-    e_build_sell.add_argument("--pct", type=float, default=None)
-    e_build_sell.add_argument("--tokens", type=float, default=None)
-    e_build_sell.add_argument("--min-sol", type=float, default=None)
-    e_build_sell.add_argument("--min-sol-lamports", type=int, default=None)
-
-    e_sim_selltx = e_sub.add_parser("simulate-selltx", help="Simulate Pump.fun sell tx (no send)")
-    e_sim_selltx.add_argument("--user", required=True)
-    e_sim_selltx.add_argument("--mint", required=True)
-    e_sim_selltx.add_argument("--pct", type=float, default=None)
-    e_sim_selltx.add_argument("--tokens", type=float, default=None)
-    e_sim_selltx.add_argument("--min-sol", type=float, default=None)
-    e_sim_selltx.add_argument("--min-sol-lamports", type=int, default=None)
-
-    e_send_sell = e_sub.add_parser("send-sell", help="SEND Pump.fun sell tx (REAL TX)")
-    e_send_sell.add_argument("--user", required=True)
-    e_send_sell.add_argument("--mint", required=True)
-    e_send_sell.add_argument("--pct", type=float, default=None)
-    e_send_sell.add_argument("--tokens", type=float, default=None)
-    e_send_sell.add_argument("--min-sol", type=float, default=None)
-    e_send_sell.add_argument("--min-sol-lamports", type=int, default=None)
-
-    args = parser.parse_args()
-
-    if not args.command:
-        print("Scrapetech booted")
+    if args.wcmd == "create":
+        out = wallet_create(args.user)
+        print(f"WALLET OK: user={args.user} pubkey={out['pubkey']}")
+        print("\nBACKUP OPTIONS (SAVE ONE OF THESE):")
+        print("1) Phantom secret key (base58, 64 bytes) — Phantom-friendly:")
+        print(out["phantom_secret_base58"])
+        print("\n2) Phantom secret key (JSON array, 64 ints) — also Phantom-friendly:")
+        print(out["phantom_secret_json"])
+        print("\n3) Seed (base58, 32 bytes) — dev format:")
+        print(out["seed_base58"])
         return
-
-    setup_logging(getattr(args, "log_level", "INFO"))
-
-    if args.command == "listen":
-        channel = args.channel or os.getenv("TEST_CHANNEL")
-        if not channel:
-            raise SystemExit("Provide --channel or set TEST_CHANNEL")
-        asyncio.run(run_listen(channel))
+    if args.wcmd == "import":
+        rec = wallet_import(args.user, args.secret)
+        print(f"WALLET OK: user={args.user} pubkey={rec.pubkey}")
         return
-
-    if args.command == "db":
-        if args.dbcmd == "init":
-            init_db()
-            print("DB INIT OK")
-            return
-        if args.dbcmd == "smoke":
-            smoke()
-            return
-        if args.dbcmd == "schema":
-            init_db()
-            with connect() as conn:
-                tables = conn.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
-                ).fetchall()
-                for t in tables:
-                    name = t["name"]
-                    print(f"\n{name}:")
-                    cols = conn.execute(f"PRAGMA table_info({name})").fetchall()
-                    for c in cols:
-                        pk = " PRIMARY KEY" if c["pk"] else ""
-                        print(f"  - {c['name']} {c['type']}{pk}")
-            return
-        if args.dbcmd == "tail":
-            init_db()
-            with connect() as conn:
-                rows = conn.execute(
-                    """
-                    SELECT s.id, c.handle, s.mint, s.confidence, s.created_at
-                    FROM signals s
-                    JOIN channels c ON c.id = s.channel_id
-                    ORDER BY s.id DESC
-                    LIMIT ?
-                    """,
-                    (args.n,),
-                ).fetchall()
-            for r in rows[::-1]:
-                print(f"{r['id']} | {r['created_at']} | {r['handle']} | {r['mint']} | conf={r['confidence']}")
+    if args.wcmd == "show":
+        pub = wallet_get_pubkey(args.user)
+        if not pub:
+            print("No wallet found.")
             return
+        print(f"user={args.user} pubkey={pub}")
+        return
 
-    if args.command == "sub":
-        if args.subcmd == "set":
-            upsert_subscription(args.user, args.channel, args.status)
-            print(f"SUB OK: user={args.user} channel={args.channel} status={args.status}")
-            return
-        if args.subcmd == "list":
-            rows = list_subscriptions(args.user)
-            if not rows:
-                print("No subscriptions found.")
-                return
-            for r in rows:
-                print(f"{r['handle']} | {r['status']} | {r['created_at']}")
-            return
 
-    if args.command == "settings":
-        if args.setcmd == "show":
-            s = get_user_settings(args.user)
-            for k in sorted(s.keys()):
-                if k in ("id", "user_id"):
-                    continue
-                print(f"{k}={s[k]}")
-            return
+def _add_trade(p_t):
+    t_sub = p_t.add_subparsers(dest="tcmd", required=True)
+    t_buy = t_sub.add_parser("buy", help="Build a buy plan (dry-run)")
+    t_buy.add_argument("--user", required=True)
+    t_buy.add_argument("--mint", required=True)
 
-        if args.setcmd == "set":
-            updates = {}
-            if args.trade_mode is not None:
-                updates["trade_mode"] = args.trade_mode
-            if args.position_mode is not None:
-                updates["position_mode"] = args.position_mode
-            if args.max_open_positions is not None:
-                updates["max_open_positions"] = args.max_open_positions
-            if args.buy_amount_sol is not None:
-                updates["buy_amount_sol"] = args.buy_amount_sol
-            if args.buy_slippage_pct is not None:
-                updates["buy_slippage_pct"] = args.buy_slippage_pct
-            if args.sell_slippage_pct is not None:
-                updates["sell_slippage_pct"] = args.sell_slippage_pct
-            if args.tp_sl_enabled is not None:
-                updates["tp_sl_enabled"] = int(args.tp_sl_enabled)
-            if args.take_profit_pct is not None:
-                updates["take_profit_pct"] = args.take_profit_pct
-            if args.stop_loss_pct is not None:
-                updates["stop_loss_pct"] = args.stop_loss_pct
-            if args.cooldown_seconds is not None:
-                updates["cooldown_seconds"] = args.cooldown_seconds
-            if args.max_trades_per_day is not None:
-                updates["max_trades_per_day"] = args.max_trades_per_day
-            if args.duplicate_mint_block is not None:
-                updates["duplicate_mint_block"] = int(args.duplicate_mint_block)
-
-            if not updates:
-                print("No updates provided.")
-                return
 
-            update_user_settings(args.user, updates)
-            print("SETTINGS OK")
-            return
+def _run_trade(args):
+    from .trade import build_buy_plan, print_buy_plan
 
-    if args.command == "intents":
-        if args.intcmd == "tail":
-            rows = tail_trade_intents(args.n)
-            if not rows:
-                print("No intents found.")
-                return
-            for r in rows[::-1]:
-                print(
-                    f"{r['id']} | {r['created_at']} | user={r['telegram_user_id']} | {r['handle']} | "
-                    f"{r['intent_type']} | {r['mint']} | {r['status']} | {r['reason'] or ''}"
-                )
-            return
+    if args.tcmd == "buy":
+        plan = build_buy_plan(args.user, args.mint)
+        print_buy_plan(plan, dry_run=True)
+        return
 
-    if args.command == "reconcile":
-        status = args.status.strip().upper() if args.status else None
-        if status in ("ALL", "*"):
-            status = None
 
-        def _run_once():
-            rows = list_pending_trades(status=status, limit=args.limit)
-            if not rows:
-                print("No pending trades.")
-                return
+def _add_exec(p_e):
+    e_sub = p_e.add_subparsers(dest="ecmd", required=True)
 
-            http = get_http_client()
-            for r in rows:
-                sig = r["signature"]
-                tx = rpc_get_transaction(http, sig)
-                if not tx or not tx.get("meta"):
-                    continue
-
-                meta = tx.get("meta") or {}
-                if meta.get("err"):
-                    update_pending_trade_status(sig, "FAILED", error=str(meta.get("err")))
-                    print(f"FAILED {sig} err={meta.get('err')}")
-                    continue
-
-                telegram_user_id = get_telegram_user_id(r["user_id"])
-                if not telegram_user_id:
-                    update_pending_trade_status(sig, "FAILED", error="user not found")
-                    print(f"FAILED {sig} err=user not found")
-                    continue
-
-                owner_pubkey = wallet_get_pubkey(telegram_user_id)
-                if not owner_pubkey:
-                    update_pending_trade_status(sig, "FAILED", error="wallet not found")
-                    print(f"FAILED {sig} err=wallet not found")
-                    continue
-
-                deltas = extract_tx_deltas(tx, owner_pubkey=owner_pubkey, mint=r["mint"])
-                sol_delta = deltas.get("sol_delta_lamports")
-                token_delta_ui = deltas.get("token_delta_ui")
-                if sol_delta is None or token_delta_ui is None:
-                    continue
-
-                actual_sol = abs(sol_delta) / 1_000_000_000
-                actual_tokens = abs(token_delta_ui)
-                apply_trade(
-                    telegram_user_id,
-                    r["mint"],
-                    r["side"],
-                    actual_tokens,
-                    actual_sol,
-                    tx_sig=sig,
-                )
-                update_pending_trade_status(
-                    sig,
-                    "SUCCESS",
-                    actual_token_amount=actual_tokens,
-                    actual_sol_amount=actual_sol,
-                )
-                print(f"OK {sig} tokens={actual_tokens} sol={actual_sol}")
-
-        if not args.watch:
-            _run_once()
-            return
+    # Shared option groups, attached to each subcommand via parents=.
+    target = argparse.ArgumentParser(add_help=False)
+    target.add_argument("--user", required=True)
+    target.add_argument("--mint", required=True)
+    sol = argparse.ArgumentParser(add_help=False)
+    sol.add_argument("--sol", type=float, default=None)
+    slip = argparse.ArgumentParser(add_help=False)
+    slip.add_argument("--slippage", type=float, default=None)
+    sell = argparse.ArgumentParser(add_help=False)
+    sell.add_argument("--pct", type=float, default=None)
+    sell.add_argument("--tokens", type=float, default=None)
+    sell.add_argument("--min-sol", type=float, default=None)
+    sell.add_argument("--min-sol-lamports", type=int, default=None)
+
+    buy = [target, sol, slip]
+    e_sub.add_parser("quote-buy", help="Quote a buy (no tx sent)", parents=[target, sol])
+    e_sub.add_parser("build-buy", help="Build Pump.fun buy instruction (no tx)", parents=buy)
+    e_sub.add_parser("simulate-buytx", help="Simulate Pump.fun buy tx (no send)", parents=buy)
+    e_sub.add_parser("send-buy", help="SEND Pump.fun buy tx (REAL TX)", parents=buy)
+    e_sub.add_parser("dump-buytx", help="Dump tx account order + existence", parents=buy)
 
-        while True:
-            _run_once()
-            time.sleep(max(1, int(args.interval)))
-
-    if args.command == "monitor":
-        print(f"Monitor started (interval={args.interval}s)")
-        monitor_positions_loop(interval=args.interval)
-
-    if args.command == "bot":
-        asyncio.run(run_bot())
-
-    if args.command == "pos":
-        if args.poscmd == "show":
-            if args.mint:
-                row = get_position(args.user, args.mint)
-                if not row:
-                    print("No position found.")
-                    return
-                print(
-                    f"{row['mint']} | tokens={row['token_balance']} | avg_entry={row['avg_entry_sol']} | "
-                    f"spent={row['total_sol_spent']} | received={row['total_sol_received']} | "
-                    f"realized_pnl={row['realized_pnl_sol']} | open={row['open']}"
-                )
-                return
-            rows = list_positions(args.user)
-            if not rows:
-                print("No positions found.")
-                return
-            for row in rows:
-                print(
-                    f"{row['mint']} | tokens={row['token_balance']} | avg_entry={row['avg_entry_sol']} | "
-                    f"spent={row['total_sol_spent']} | received={row['total_sol_received']} | "
-                    f"realized_pnl={row['realized_pnl_sol']} | open={row['open']}"
-                )
-            return
-        if args.poscmd == "apply":
-            row = apply_trade(
-                args.user,
-                args.mint,
-                args.side,
-                args.tokens,
-                args.sol,
-                tx_sig=args.tx,
+    # sell (pumpfun)
+    e_sub.add_parser("build-sell", help="Build Pump.fun sell instruction (no tx)", parents=[target, sell])
+    e_sub.add_parser("simulate-selltx", help="Simulate Pump.fun sell tx (no send)", parents=[target, sell])
+    e_sub.add_parser("send-sell", help="SEND Pump.fun sell tx (REAL TX)", parents=[target, sell])
+
+
+def _resolve_sell_amount(user: str, mint: str, pct: float | None, tokens_ui: float | None):
+    from .solana_rpc import try_get_mint_decimals
+
+    if tokens_ui is None:
+        pct_val = 100.0 if pct is None else float(pct)
+        if pct_val <= 0 or pct_val > 100:
+            raise ValueError("pct must be in (0,100]")
+        pos = get_position(user, mint)
+        if not pos or float(pos.get("token_balance") or 0) <= 0:
+            raise ValueError("No position balance found for this user+mint")
+        tokens_ui = float(pos["token_balance"]) * (pct_val / 100.0)
+
+    decimals = try_get_mint_decimals(mint)
+    if decimals is None:
+        raise ValueError("Could not determine mint decimals for sell sizing")
+
+    tokens_raw = int(tokens_ui * (10 ** int(decimals)))
+    if tokens_raw <= 0:
+        raise ValueError("tokens_to_sell_raw computed as 0; adjust pct/tokens")
+    return tokens_ui, tokens_raw, int(decimals)
+
+
+def _resolve_min_sol(min_sol: float | None, min_sol_lamports: int | None) -> int:
+    if min_sol_lamports is not None:
+        return int(min_sol_lamports)
+    if min_sol is not None:
+        from .solana_rpc import sol_to_lamports
+        return sol_to_lamports(min_sol)
+    return 1
+
+
+@lru_cache(maxsize=32)
+def _settings(user: str) -> dict:
+    # get_user_settings also creates the user row; cleared at the top of main().
+    return get_user_settings(user)
+
+
+@lru_cache(maxsize=32)
+def _wallet(user: str, kind: str):
+    # Decrypting the seed is the expensive part; reuse it within one invocation.
+    # Cleared at the top of main() so a wallet switch is always picked up.
+    if kind == "keypair":
+        from .pump_tx import load_keypair_for_user
+        return load_keypair_for_user(user)
+    from .pump_tx import load_pubkey_for_user
+    return load_pubkey_for_user(user)
+
+
+def _buy_params(args, settings) -> tuple[float, float]:
+    # argparse (type=float) and get_user_settings already hand back floats.
+    sol_in = args.sol if args.sol is not None else settings["buy_amount_sol"]
+    sl = args.slippage if args.slippage is not None else settings["buy_slippage_pct"]
+    return sol_in, sl
+
+
+def _exec_quote_buy(args, settings, kp):
+    from .pump_quotes import quote_buy_pumpfun
+
+    sol_in = args.sol if args.sol is not None else settings["buy_amount_sol"]
+    q = quote_buy_pumpfun(args.mint, sol_in=sol_in, fee_bps=0)
+
+    lines = [
+        "=== Scrapetech Quote Buy ===",
+        f"USER: {args.user}",
+        f"MINT: {q.mint}",
+        f"ROUTE: {q.route}",
+        f"SOL IN: {q.sol_in}",
+        f"EST TOKENS OUT (raw units): {q.est_tokens_out_raw}",
+    ]
+    if getattr(q, "mint_decimals", None) is not None and getattr(q, "est_tokens_out_ui", None) is not None:
+        lines.append(f"EST TOKENS OUT (UI): {q.est_tokens_out_ui:,.6f} (decimals={q.mint_decimals})")
+    if getattr(q, "est_price_sol_per_token", None) is not None and getattr(q, "est_tokens_out_ui", None):
+        if q.est_tokens_out_ui and q.est_tokens_out_ui > 0:
+            sol_per_token = q.sol_in / q.est_tokens_out_ui
+            tokens_per_sol = q.est_tokens_out_ui / q.sol_in
+            lines.append(f"PRICE: {sol_per_token:.12f} SOL per token")
+            lines.append(f"PRICE: {tokens_per_sol:,.2f} tokens per SOL")
+    if getattr(q, "token_program", None) is not None:
+        lines.append(f"TOKEN PROGRAM: {q.token_program}")
+    lines += [
+        f"CURVE PDA: {q.curve_pda}",
+        f"CREATOR: {q.creator}",
+        f"CURVE COMPLETE: {q.curve_complete}",
+        "NO TRANSACTION SENT.",
+    ]
+    _write_lines(lines)
+
+
+def _exec_build_buy(args, settings, owner):
+    from .pump_tx import build_buy_ix_and_plan
+
+    sol_in, sl = _buy_params(args, settings)
+
+    plan, _ix = build_buy_ix_and_plan(
+        user_keypair=None, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl, user_pubkey=owner
+    )
+
+    lines = [
+        "=== Scrapetech Build Buy (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKEN PROGRAM: {plan.token_program}",
+        f"BONDING CURVE: {plan.bonding_curve}",
+        f"ASSOCIATED USER: {plan.user_ata}",
+        f"TOKENS OUT (raw): {plan.tokens_out_raw}",
+        f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)",
+        "NO TRANSACTION SENT.",
+    ]
+    _write_lines(lines)
+
+
+def _exec_simulate_buytx(args, settings, kp):
+    from .pump_tx import build_and_simulate_buy_tx
+
+    sol_in, sl = _buy_params(args, settings)
+
+    out = build_and_simulate_buy_tx(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
+
+    plan = out["plan"]
+    sim = out["simulate"]
+
+    lines = [
+        "=== Scrapetech Simulate Buy TX (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKEN PROGRAM: {plan.token_program}",
+        f"TOKENS OUT (raw): {plan.tokens_out_raw}",
+        f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)",
+        f"SIM ERR: {getattr(sim, 'err', None)}",
+    ]
+    logs = getattr(sim, "logs", None)
+    if logs:
+        lines.append("---- LOGS ----")
+        lines.extend(logs)
+    lines.append("NO TRANSACTION SENT.")
+    _write_lines(lines)
+
+
+def _exec_send_buy(args, settings, kp):
+    import asyncio
+    from .pump_tx import send_buy_tx
+    from .solana_rpc import (
+        try_get_mint_decimals,
+        rpc_get_transaction_async,
+        rpc_wait_for_signature_async,
+        extract_tx_deltas,
+        get_async_http_client,
+    )
+
+    sol_in, sl = _buy_params(args, settings)
+
+    out = send_buy_tx(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
+
+    plan = out["plan"]
+    sig = out["sig"]
+
+    req_tokens_ui = None
+    decimals = try_get_mint_decimals(plan.mint)
+    if decimals is not None:
+        req_tokens_ui = plan.tokens_out_raw / (10 ** int(decimals))
+
+    async def _await_confirmed() -> dict:
+        # Record the pending trade while we wait on the signature.
+        async with get_async_http_client() as http:
+            status, _ = await asyncio.gather(
+                rpc_wait_for_signature_async(http, sig, timeout=12.0),
+                asyncio.to_thread(
+                    enqueue_pending_trade,
+                    args.user,
+                    plan.mint,
+                    "BUY",
+                    sig,
+                    requested_token_amount=req_tokens_ui,
+                    requested_sol_amount=sol_in,
+                ),
             )
-            if not row:
-                print("No position found.")
-                return
-            print(
-                f"{row['mint']} | tokens={row['token_balance']} | avg_entry={row['avg_entry_sol']} | "
-                f"spent={row['total_sol_spent']} | received={row['total_sol_received']} | "
-                f"realized_pnl={row['realized_pnl_sol']} | open={row['open']}"
+            if not status or status.get("err"):
+                return {}
+            try:
+                tx = await rpc_get_transaction_async(http, sig, commitment="confirmed")
+                return extract_tx_deltas(tx, plan.user_pubkey, plan.mint)
+            except Exception:
+                return {}
+
+    sol_amount = None
+    token_amount_ui = None
+    deltas = asyncio.run(_await_confirmed())
+    sol_delta = deltas.get("sol_delta_lamports")
+    token_delta_ui = deltas.get("token_delta_ui")
+    if sol_delta is not None:
+        sol_amount = abs(sol_delta) / 1_000_000_000
+    if token_delta_ui is not None:
+        token_amount_ui = abs(token_delta_ui)
+
+    if sol_amount is not None and token_amount_ui is not None:
+        try:
+            apply_trade_and_finalize(args.user, plan.mint, "BUY", token_amount_ui, sol_amount, sig)
+        except Exception:
+            pass
+
+    lines = [
+        "=== Scrapetech SEND BUY (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKEN PROGRAM: {plan.token_program}",
+        f"TOKENS OUT (raw): {plan.tokens_out_raw}",
+        f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)",
+        f"SIGNATURE: {sig}",
+    ]
+    if sig:
+        lines.append(f"SOLSCAN: https://solscan.io/tx/{sig}")
+    _write_lines(lines)
+
+
+def _exec_dump_buytx(args, settings, owner):
+    from .pump_tx import ata_create_idempotent_ix, build_buy_ix_and_plan, dump_ix_accounts
+    from .cli_cache import _pk, _ata
+    from .solana_rpc import get_http_client, rpc_get_multiple_accounts
+
+    sol_in, sl = _buy_params(args, settings)
+
+    plan, buy_ix = build_buy_ix_and_plan(
+        user_keypair=None, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl, user_pubkey=owner
+    )
+
+    mint = _pk(args.mint)
+    token_program = _pk(str(plan.token_program))
+    user_ata = _ata(owner, mint, token_program)
+    ata_ix = ata_create_idempotent_ix(owner, owner, mint, user_ata, token_program)
+
+    # walk each ix's accounts once; reused for the existence check and the dump
+    dumped = [(ix, dump_ix_accounts(ix)) for ix in (ata_ix, buy_ix)]
+    # collect all pubkeys referenced by both ixs (ATA + buy), first-seen order
+    all_pubkeys = list(dict.fromkeys(pk for _ix, metas in dumped for _i, _sig, _w, pk in metas))
+
+    http = get_http_client()
+    vals = rpc_get_multiple_accounts(http, all_pubkeys)
+    missing = frozenset(pk for pk, v in zip(all_pubkeys, vals) if v is None)
+
+    lines = [
+        "=== Scrapetech Dump BuyTX ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKEN PROGRAM: {plan.token_program}",
+    ]
+
+    if missing:
+        lines.append("\nMISSING (nonexistent) pubkeys:")
+        for pk in sorted(missing):
+            lines.append(f"  - {pk}")
+
+    for idx, (ix, metas) in enumerate(dumped):
+        lines.append(f"\nIX {idx} program={ix.program_id}")
+        for i, is_sig, is_w, pk in metas:
+            status = "MISSING" if pk in missing else "OK"
+            flags = ("W" if is_w else "-") + ("S" if is_sig else "-")
+            lines.append(f"  [{i:02d}] {status} {flags} {pk}")
+    _write_lines(lines)
+
+
+def _exec_build_sell(args, settings, kp):
+    from .pump_sell import build_sell_ix_and_plan
+
+    tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
+        args.user, args.mint, args.pct, args.tokens
+    )
+    min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
+
+    plan, _ix = build_sell_ix_and_plan(
+        user_keypair=kp,
+        mint_str=args.mint,
+        tokens_to_sell_raw=tokens_raw,
+        min_sol_output_lamports=min_sol,
+    )
+
+    lines = [
+        "=== Scrapetech Build Sell (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKEN PROGRAM: {plan.token_program}",
+        f"BONDING CURVE: {plan.bonding_curve}",
+        f"ASSOCIATED USER: {plan.user_ata}",
+        f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}",
+        f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})",
+        f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}",
+        "NO TRANSACTION SENT.",
+    ]
+    _write_lines(lines)
+
+
+def _exec_simulate_selltx(args, settings, kp):
+    from .pump_sell import build_sell_ix_and_plan, build_and_simulate_sell_tx
+
+    tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
+        args.user, args.mint, args.pct, args.tokens
+    )
+    min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
+
+    plan, sell_ix = build_sell_ix_and_plan(
+        user_keypair=kp,
+        mint_str=args.mint,
+        tokens_to_sell_raw=tokens_raw,
+        min_sol_output_lamports=min_sol,
+    )
+    sim = build_and_simulate_sell_tx(user_keypair=kp, sell_ix=sell_ix)
+
+    lines = [
+        "=== Scrapetech Simulate Sell TX (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}",
+        f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})",
+        f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}",
+        f"SIM ERR: {sim.get('err')}",
+    ]
+    logs = sim.get("logs")
+    if logs:
+        lines.append("---- LOGS ----")
+        lines.extend(logs)
+    lines.append("NO TRANSACTION SENT.")
+    _write_lines(lines)
+
+
+def _exec_send_sell(args, settings, kp):
+    import asyncio
+    from .pump_sell import build_sell_ix_and_plan, send_sell_tx
+    from .solana_rpc import (
+        rpc_get_transaction_async,
+        rpc_wait_for_signature_async,
+        extract_tx_deltas,
+        get_async_http_client,
+    )
+
+    tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
+        args.user, args.mint, args.pct, args.tokens
+    )
+    min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
+
+    plan, sell_ix = build_sell_ix_and_plan(
+        user_keypair=kp,
+        mint_str=args.mint,
+        tokens_to_sell_raw=tokens_raw,
+        min_sol_output_lamports=min_sol,
+    )
+    sig = send_sell_tx(user_keypair=kp, sell_ix=sell_ix)
+
+    async def _await_sell_result() -> None:
+        # Record the pending trade while we wait on the signature; status pings
+        # back off 0.5s, 1s, 2s, 2s... before a single getTransaction.
+        async with get_async_http_client() as http:
+            status, _ = await asyncio.gather(
+                rpc_wait_for_signature_async(http, sig, timeout=12.0, interval=0.5, max_interval=2.0),
+                asyncio.to_thread(
+                    enqueue_pending_trade,
+                    args.user,
+                    plan.mint,
+                    "SELL",
+                    sig,
+                    requested_token_amount=tokens_ui,
+                    requested_sol_amount=min_sol / 1_000_000_000,
+                ),
             )
-            return
-
-    if args.command == "wallet":
-        if args.wcmd == "create":
-            out = wallet_create(args.user)
-            print(f"WALLET OK: user={args.user} pubkey={out['pubkey']}")
-            print("\nBACKUP OPTIONS (SAVE ONE OF THESE):")
-            print("1) Phantom secret key (base58, 64 bytes) — Phantom-friendly:")
-            print(out["phantom_secret_base58"])
-            print("\n2) Phantom secret key (JSON array, 64 ints) — also Phantom-friendly:")
-            print(out["phantom_secret_json"])
-            print("\n3) Seed (base58, 32 bytes) — dev format:")
-            print(out["seed_base58"])
-            return
-        if args.wcmd == "import":
-            rec = wallet_import(args.user, args.secret)
-            print(f"WALLET OK: user={args.user} pubkey={rec.pubkey}")
-            return
-        if args.wcmd == "show":
-            pub = wallet_get_pubkey(args.user)
-            if not pub:
-                print("No wallet found.")
+            if not status or status.get("err"):
+                return
+            try:
+                tx = await rpc_get_transaction_async(http, sig, commitment="confirmed")
+                deltas = extract_tx_deltas(tx, plan.user_pubkey, plan.mint)
+            except Exception:
                 return
-            print(f"user={args.user} pubkey={pub}")
-            return
-
-    if args.command == "trade":
-        if args.tcmd == "buy":
-            plan = build_buy_plan(args.user, args.mint)
-            print_buy_plan(plan, dry_run=True)
-            return
-
-    if args.command == "exec":
-        def _resolve_sell_amount(user: str, mint: str, pct: float | None, tokens_ui: float | None):
-            if tokens_ui is None:
-                pct_val = 100.0 if pct is None else float(pct)
-                if pct_val <= 0 or pct_val > 100:
-                    raise ValueError("pct must be in (0,100]")
-                pos = get_position(user, mint)
-                if not pos or float(pos.get("token_balance") or 0) <= 0:
-                    raise ValueError("No position balance found for this user+mint")
-                tokens_ui = float(pos["token_balance"]) * (pct_val / 100.0)
-
-            decimals = try_get_mint_decimals(mint)
-            if decimals is None:
-                raise ValueError("Could not determine mint decimals for sell sizing")
-
-            tokens_raw = int(tokens_ui * (10 ** int(decimals)))
-            if tokens_raw <= 0:
-                raise ValueError("tokens_to_sell_raw computed as 0; adjust pct/tokens")
-            return tokens_ui, tokens_raw, int(decimals)
-
-        def _resolve_min_sol(min_sol: float | None, min_sol_lamports: int | None) -> int:
-            if min_sol_lamports is not None:
-                return int(min_sol_lamports)
-            if min_sol is not None:
-                return int(float(min_sol) * 1_000_000_000)
-            return 1
-
-        # quote-buy
-        if args.ecmd == "quote-buy":
-            from .db import get_or_create_user
-            get_or_create_user(args.user)
-            s = get_user_settings(args.user)
-            sol_in = float(args.sol) if args.sol is not None else float(s["buy_amount_sol"])
-            q = quote_buy_pumpfun(args.mint, sol_in=sol_in, fee_bps=0)
-
-            print("=== Scrapetech Quote Buy ===")
-            print(f"USER: {args.user}")
-            print(f"MINT: {q.mint}")
-            print(f"ROUTE: {q.route}")
-            print(f"SOL IN: {q.sol_in}")
-            print(f"EST TOKENS OUT (raw units): {q.est_tokens_out_raw}")
-            if getattr(q, "mint_decimals", None) is not None and getattr(q, "est_tokens_out_ui", None) is not None:
-                print(f"EST TOKENS OUT (UI): {q.est_tokens_out_ui:,.6f} (decimals={q.mint_decimals})")
-            if getattr(q, "est_price_sol_per_token", None) is not None and getattr(q, "est_tokens_out_ui", None):
-                if q.est_tokens_out_ui and q.est_tokens_out_ui > 0:
-                    sol_per_token = q.sol_in / q.est_tokens_out_ui
-                    tokens_per_sol = q.est_tokens_out_ui / q.sol_in
-                    print(f"PRICE: {sol_per_token:.12f} SOL per token")
-                    print(f"PRICE: {tokens_per_sol:,.2f} tokens per SOL")
-            if getattr(q, "token_program", None) is not None:
-                print(f"TOKEN PROGRAM: {q.token_program}")
-            print(f"CURVE PDA: {q.curve_pda}")
-            print(f"CREATOR: {q.creator}")
-            print(f"CURVE COMPLETE: {q.curve_complete}")
-            print("NO TRANSACTION SENT.")
-            return
-
-        # build-buy
-        if args.ecmd == "build-buy":
-            from .db import get_or_create_user
-            get_or_create_user(args.user)
-            settings = get_user_settings(args.user)
-            sol_in = float(args.sol) if args.sol is not None else float(settings["buy_amount_sol"])
-            sl = float(args.slippage) if args.slippage is not None else float(settings["buy_slippage_pct"])
-
-            kp = load_keypair_for_user(args.user)
-            plan, _ix = build_buy_ix_and_plan(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
-
-            print("=== Scrapetech Build Buy (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKEN PROGRAM: {plan.token_program}")
-            print(f"BONDING CURVE: {plan.bonding_curve}")
-            print(f"ASSOCIATED USER: {plan.user_ata}")
-            print(f"TOKENS OUT (raw): {plan.tokens_out_raw}")
-            print(f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)")
-            print("NO TRANSACTION SENT.")
-            return
 
-        # simulate-buytx
-        if args.ecmd == "simulate-buytx":
-            from .db import get_or_create_user
-            get_or_create_user(args.user)
-            settings = get_user_settings(args.user)
-            sol_in = float(args.sol) if args.sol is not None else float(settings["buy_amount_sol"])
-            sl = float(args.slippage) if args.slippage is not None else float(settings["buy_slippage_pct"])
-
-            kp = load_keypair_for_user(args.user)
-            out = build_and_simulate_buy_tx(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
-
-            plan = out["plan"]
-            sim = out["simulate"]
-
-            print("=== Scrapetech Simulate Buy TX (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKEN PROGRAM: {plan.token_program}")
-            print(f"TOKENS OUT (raw): {plan.tokens_out_raw}")
-            print(f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)")
-            print(f"SIM ERR: {getattr(sim, 'err', None)}")
-            logs = getattr(sim, "logs", None)
-            if logs:
-                print("---- LOGS ----")
-                for line in logs:
-                    print(line)
-            print("NO TRANSACTION SENT.")
+        sol_delta = deltas.get("sol_delta_lamports")
+        token_delta_ui = deltas.get("token_delta_ui")
+        if sol_delta is None or token_delta_ui is None:
             return
-
-
-        # send-buy (REAL SEND)
-        if args.ecmd == "send-buy":
-            from .db import get_or_create_user
-            get_or_create_user(args.user)
-            settings = get_user_settings(args.user)
-
-            sol_in = float(args.sol) if args.sol is not None else float(settings["buy_amount_sol"])
-            sl = float(args.slippage) if args.slippage is not None else float(settings["buy_slippage_pct"])
-
-            kp = load_keypair_for_user(args.user)
-            out = send_buy_tx(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
-
-            plan = out["plan"]
-            sig = out["sig"]
-
-            req_tokens_ui = None
-            decimals = try_get_mint_decimals(plan.mint)
-            if decimals is not None:
-                req_tokens_ui = plan.tokens_out_raw / (10 ** int(decimals))
-
-            enqueue_pending_trade(
+        try:
+            await asyncio.to_thread(
+                apply_trade_and_finalize,
                 args.user,
-                plan.mint,
-                "BUY",
+                args.mint,
+                "SELL",
+                abs(token_delta_ui),
+                sol_delta / 1_000_000_000,
                 sig,
-                requested_token_amount=req_tokens_ui,
-                requested_sol_amount=sol_in,
             )
+        except Exception:
+            pass
+
+    asyncio.run(_await_sell_result())
+
+    lines = [
+        "=== Scrapetech SEND SELL (Pump.fun) ===",
+        f"USER: {args.user}",
+        f"WALLET: {plan.user_pubkey}",
+        f"MINT: {plan.mint}",
+        f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}",
+        f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})",
+        f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}",
+        f"SIGNATURE: {sig}",
+    ]
+    if sig:
+        lines.append(f"SOLSCAN: https://solscan.io/tx/{sig}")
+    _write_lines(lines)
+
+
+# ecmd -> (handler, needs settings, wallet access). Sell paths size from the
+# position table and skip settings; paths that never sign get the public key
+# only ("pubkey"), so the seed is not decrypted; quote-buy needs no wallet.
+_EXEC_HANDLERS = {
+    "quote-buy": (_exec_quote_buy, True, None),
+    "build-buy": (_exec_build_buy, True, "pubkey"),
+    "simulate-buytx": (_exec_simulate_buytx, True, "keypair"),
+    "send-buy": (_exec_send_buy, True, "keypair"),
+    "dump-buytx": (_exec_dump_buytx, True, "pubkey"),
+    "build-sell": (_exec_build_sell, False, "keypair"),
+    "simulate-selltx": (_exec_simulate_selltx, False, "keypair"),
+    "send-sell": (_exec_send_sell, False, "keypair"),
+}
+
+
+def _run_exec(args):
+    handler, needs_settings, wallet = _EXEC_HANDLERS[args.ecmd]
+
+    settings = None
+    if needs_settings:
+        settings = _settings(args.user)
+
+    kp = _wallet(args.user, wallet) if wallet else None
+    handler(args, settings, kp)
+
+
+# command -> (help, add arguments to its parser, run)
+COMMANDS = {
+    "listen": ("Listen to a Telegram channel", _add_listen, _run_listen),
+    "db": ("Database utilities", _add_db, _run_db),
+    "sub": ("Subscription utilities (CLI testing)", _add_sub, _run_sub),
+    "settings": ("User settings (CLI testing)", _add_settings, _run_settings),
+    "intents": ("Trade intents (CLI testing)", _add_intents, _run_intents),
+    "reconcile": ("Reconcile pending trades", _add_reconcile, _run_reconcile),
+    "monitor": ("Monitor positions for TP/SL and auto-sell", _add_monitor, _run_monitor),
+    "bot": ("Run Telegram bot commands (user-facing)", None, _run_bot),
+    "daemon": ("Run bot + monitor + reconcile in one process", _add_daemon, _run_daemon),
+    "pos": ("Position utilities (CLI testing)", _add_pos, _run_pos),
+    "wallet": ("Wallet utilities (CLI testing)", _add_wallet, _run_wallet),
+    "trade": ("Manual trading (dry-run plan)", _add_trade, _run_trade),
+    "exec": ("Pump.fun execution (quote/build/sim/dump)", _add_exec, _run_exec),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    _settings.cache_clear()
+    _wallet.cache_clear()
+    parser = argparse.ArgumentParser("scrapetech")
+    sub = parser.add_subparsers(dest="command", required=False)
 
-            sol_amount = None
-            token_amount_ui = None
-            http = get_http_client()
-            for _ in range(6):
-                try:
-                    tx = rpc_get_transaction(http, sig)
-                    deltas = extract_tx_deltas(tx, plan.user_pubkey, plan.mint)
-                    sol_delta = deltas.get("sol_delta_lamports")
-                    token_delta_ui = deltas.get("token_delta_ui")
-                    if sol_delta is not None:
-                        sol_amount = abs(sol_delta) / 1_000_000_000
-                    if token_delta_ui is not None:
-                        token_amount_ui = abs(token_delta_ui)
-                    if sol_amount is not None and token_amount_ui is not None:
-                        break
-                except Exception:
-                    pass
-                time.sleep(2)
-
-            if sol_amount is not None and token_amount_ui is not None:
-                try:
-                    apply_trade(
-                        args.user,
-                        plan.mint,
-                        "BUY",
-                        float(token_amount_ui),
-                        float(sol_amount),
-                        tx_sig=sig,
-                    )
-                    update_pending_trade_status(
-                        sig,
-                        "SUCCESS",
-                        actual_token_amount=float(token_amount_ui),
-                        actual_sol_amount=float(sol_amount),
-                    )
-                except Exception:
-                    pass
-
-            print("=== Scrapetech SEND BUY (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKEN PROGRAM: {plan.token_program}")
-            print(f"TOKENS OUT (raw): {plan.tokens_out_raw}")
-            print(f"MAX SOL COST (lamports): {plan.max_sol_cost_lamports} (slippage={plan.slippage_pct}%)")
-            print(f"SIGNATURE: {sig}")
-            if sig:
-                print(f"SOLSCAN: https://solscan.io/tx/{sig}")
-            return
-
-        # dump-buytx
-        if args.ecmd == "dump-buytx":
-            from .db import get_or_create_user
-            from .pump_tx import ata_create_idempotent_ix
-            from .solana_rpc import rpc_get_multiple_accounts
-        
-            get_or_create_user(args.user)
-            settings = get_user_settings(args.user)
-            sol_in = float(args.sol) if args.sol is not None else float(settings["buy_amount_sol"])
-            sl = float(args.slippage) if args.slippage is not None else float(settings["buy_slippage_pct"])
-        
-            kp = load_keypair_for_user(args.user)
-            plan, buy_ix = build_buy_ix_and_plan(user_keypair=kp, mint_str=args.mint, sol_in=sol_in, slippage_pct=sl)
-        
-            owner = kp.pubkey()
-            mint = Pubkey.from_string(args.mint)
-            token_program = Pubkey.from_string(str(plan.token_program))
-            from spl.token.instructions import get_associated_token_address
-            mint_pk = Pubkey.from_string(args.mint)
-            owner = Pubkey.from_string(str(plan.user_pubkey))
-            token_prog = Pubkey.from_string(str(plan.token_program))
-            user_ata = get_associated_token_address(owner=owner, mint=mint_pk, token_program_id=token_prog)
-            bonding_curve = Pubkey.from_string(str(plan.bonding_curve))
-            assoc_bonding_curve = get_associated_token_address(owner=bonding_curve, mint=mint_pk, token_program_id=token_prog)
-            ata_ix = ata_create_idempotent_ix(owner, owner, mint, user_ata, token_program)
-        
-            # collect all pubkeys referenced by both ixs (ATA + buy)
-            all_pubkeys = []
-            for ix in (ata_ix, buy_ix):
-                for _i, _sig, _w, pk in dump_ix_accounts(ix):
-                    if pk not in all_pubkeys:
-                        all_pubkeys.append(pk)
-        
-            http = get_http_client()
-            vals = rpc_get_multiple_accounts(http, all_pubkeys)
-            missing = set(pk for pk, v in zip(all_pubkeys, vals) if v is None)
-        
-            print("=== Scrapetech Dump BuyTX ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKEN PROGRAM: {plan.token_program}")
-        
-            if missing:
-                print("\nMISSING (nonexistent) pubkeys:")
-                for pk in sorted(missing):
-                    print(f"  - {pk}")
-        
-            def _dump(ix, idx):
-                print(f"\nIX {idx} program={ix.program_id}")
-                for i, is_sig, is_w, pk in dump_ix_accounts(ix):
-                    status = "MISSING" if pk in missing else "OK"
-                    flags = ("W" if is_w else "-") + ("S" if is_sig else "-")
-                    print(f"  [{i:02d}] {status} {flags} {pk}")
-        
-            _dump(ata_ix, 0)
-            _dump(buy_ix, 1)
-            return
+    # Only the requested command gets its arguments; --help, no command, or an
+    # unknown command just list the command names.
+    command = argv[0] if argv else None
+    for name, (help_, add, _run) in COMMANDS.items():
+        p = sub.add_parser(name, help=help_)
+        if add and name == command:
+            add(p)
 
-        # build-sell
-        if args.ecmd == "build-sell":
-            tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
-                args.user, args.mint, args.pct, args.tokens
-            )
-            min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
-
-            kp = load_keypair_for_user(args.user)
-            plan, _ix = build_sell_ix_and_plan(
-                user_keypair=kp,
-                mint_str=args.mint,
-                tokens_to_sell_raw=tokens_raw,
-                min_sol_output_lamports=min_sol,
-            )
+    args = parser.parse_args(argv)
 
-            print("=== Scrapetech Build Sell (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKEN PROGRAM: {plan.token_program}")
-            print(f"BONDING CURVE: {plan.bonding_curve}")
-            print(f"ASSOCIATED USER: {plan.user_ata}")
-            print(f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}")
-            print(f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})")
-            print(f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}")
-            print("NO TRANSACTION SENT.")
-            return
-
-        # simulate-selltx
-        if args.ecmd == "simulate-selltx":
-            tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
-                args.user, args.mint, args.pct, args.tokens
-            )
-            min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
-
-            kp = load_keypair_for_user(args.user)
-            plan, sell_ix = build_sell_ix_and_plan(
-                user_keypair=kp,
-                mint_str=args.mint,
-                tokens_to_sell_raw=tokens_raw,
-                min_sol_output_lamports=min_sol,
-            )
-            sim = build_and_simulate_sell_tx(user_keypair=kp, sell_ix=sell_ix)
-
-            print("=== Scrapetech Simulate Sell TX (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}")
-            print(f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})")
-            print(f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}")
-            print(f"SIM ERR: {sim.get('err')}")
-            logs = sim.get("logs")
-            if logs:
-                print("---- LOGS ----")
-                for line in logs:
-                    print(line)
-            print("NO TRANSACTION SENT.")
-            return
+    if not args.command:
+        print("Scrapetech booted")
+        return
 
-        # send-sell (REAL SEND)
-        if args.ecmd == "send-sell":
-            tokens_ui, tokens_raw, decimals = _resolve_sell_amount(
-                args.user, args.mint, args.pct, args.tokens
-            )
-            min_sol = _resolve_min_sol(args.min_sol, args.min_sol_lamports)
-
-            kp = load_keypair_for_user(args.user)
-            plan, sell_ix = build_sell_ix_and_plan(
-                user_keypair=kp,
-                mint_str=args.mint,
-                tokens_to_sell_raw=tokens_raw,
-                min_sol_output_lamports=min_sol,
-            )
-            sig = send_sell_tx(user_keypair=kp, sell_ix=sell_ix)
+    setup_logging(getattr(args, "log_level", "INFO"))
+    COMMANDS[args.command][2](args)
 
-            enqueue_pending_trade(
-                args.user,
-                plan.mint,
-                "SELL",
-                sig,
-                requested_token_amount=float(tokens_ui),
-                requested_sol_amount=float(min_sol) / 1_000_000_000,
-            )
 
-            sol_amount = None
-            token_amount_ui = None
-            http = get_http_client()
-            for _ in range(6):
-                try:
-                    tx = rpc_get_transaction(http, sig)
-                    deltas = extract_tx_deltas(tx, plan.user_pubkey, plan.mint)
-                    sol_delta = deltas.get("sol_delta_lamports")
-                    token_delta_ui = deltas.get("token_delta_ui")
-                    if sol_delta is not None:
-                        sol_amount = sol_delta / 1_000_000_000
-                    if token_delta_ui is not None:
-                        token_amount_ui = abs(token_delta_ui)
-                    if sol_amount is not None and token_amount_ui is not None:
-                        break
-                except Exception:
-                    pass
-                time.sleep(2)
-
-            if sol_amount is not None and token_amount_ui is not None:
-                try:
-                    apply_trade(
-                        args.user,
-                        args.mint,
-                        "SELL",
-                        float(token_amount_ui),
-                        float(sol_amount),
-                        tx_sig=sig,
-                    )
-                    update_pending_trade_status(
-                        sig,
-                        "SUCCESS",
-                        actual_token_amount=float(token_amount_ui),
-                        actual_sol_amount=float(sol_amount),
-                    )
-                except Exception:
-                    pass
-
-            print("=== Scrapetech SEND SELL (Pump.fun) ===")
-            print(f"USER: {args.user}")
-            print(f"WALLET: {plan.user_pubkey}")
-            print(f"MINT: {plan.mint}")
-            print(f"TOKENS TO SELL (raw): {plan.tokens_to_sell_raw}")
-            print(f"TOKENS TO SELL (ui): {tokens_ui} (decimals={decimals})")
-            print(f"MIN SOL OUTPUT (lamports): {plan.min_sol_output_lamports}")
-            print(f"SIGNATURE: {sig}")
-            if sig:
-                print(f"SOLSCAN: https://solscan.io/tx/{sig}")
-            return
 if __name__ == "__main__":
     main()
@@ -0,0 +1,14 @@
+from functools import lru_cache
+
+from solders.pubkey import Pubkey
+from spl.token.instructions import get_associated_token_address
+
+
+@lru_cache(maxsize=4096)
+def _pk(s: str) -> Pubkey:
+    return Pubkey.from_string(s)
+
+
+@lru_cache(maxsize=4096)
+def _ata(owner: Pubkey, mint: Pubkey, token_program: Pubkey) -> Pubkey:
+    return get_associated_token_address(owner=owner, mint=mint, token_program_id=token_program)
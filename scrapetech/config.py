@@ -1,16 +1,26 @@
 from dataclasses import dataclass
+from functools import cache
 import os
 from dotenv import load_dotenv
-from pathlib import Path
 
-_HERE = Path(__file__).resolve().parent
-_CANDIDATES = [_HERE / ".env", _HERE.parent / ".env"]
-for _p in _CANDIDATES:
-    if _p.exists():
-        load_dotenv(dotenv_path=_p)
-        break
-else:
-    load_dotenv()
+_HERE = os.path.dirname(__file__)
+_CANDIDATES = (os.path.join(_HERE, ".env"), os.path.join(os.path.dirname(_HERE), ".env"))
+
+@cache
+def _dotenv_path() -> str | None:
+    return next((p for p in _CANDIDATES if os.path.isfile(p)), None)
+
+@cache
+def _load_once() -> None:
+    path = _dotenv_path()
+    if path:
+        load_dotenv(dotenv_path=path)
+    else:
+        load_dotenv()
+
+# Still loaded at import: db reads SCRAPETECH_DB when it is imported, right
+# after the listener imports this module.
+_load_once()
 
 @dataclass(frozen=True)
 class Settings:
@@ -20,6 +30,7 @@ class Settings:
 
     @staticmethod
     def from_env():
+        _load_once()
         api_id = os.getenv("TELEGRAM_API_ID", "").strip()
         api_hash = os.getenv("TELEGRAM_API_HASH", "").strip()
         session = os.getenv("TELETHON_SESSION", "scrapetech_session").strip()
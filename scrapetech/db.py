@@ -1,6 +1,11 @@
+import atexit
+import json
 import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Iterator
 
 DEFAULT_DB_PATH = os.getenv("SCRAPETECH_DB", "scrapetech.db")
@@ -11,21 +16,128 @@ def _ensure_column(conn: sqlite3.Connection, table: str, column: str, ddl: str)
         return
     conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl};")
 
+_SYNCHRONOUS = os.getenv("SCRAPETECH_SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+if _SYNCHRONOUS not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+    _SYNCHRONOUS = "NORMAL"
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip())
+    except ValueError:
+        return default
+
+# Page cache size in KiB; cache_size takes it negated, so a stray sign is ignored.
+_CACHE_KIB = abs(_env_int("SCRAPETECH_SQLITE_CACHE_KIB", 65536))
+
+_MMAP_BYTES = _env_int("SCRAPETECH_SQLITE_MMAP_BYTES", 268435456)
+if _MMAP_BYTES < 0:
+    _MMAP_BYTES = 268435456
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    f"PRAGMA synchronous={_SYNCHRONOUS};",
+    "PRAGMA busy_timeout=5000;",
+    f"PRAGMA cache_size=-{_CACHE_KIB};",
+    "PRAGMA temp_store=MEMORY;",
+    f"PRAGMA mmap_size={_MMAP_BYTES};",
+    "PRAGMA journal_size_limit=67108864;",
+    "PRAGMA foreign_keys=ON;",
+)
+
+_READ_POOL_SIZE = max(2, min(8, os.cpu_count() or 2))
+
+# One long-lived writer connection per database (serialized by a lock) plus a
+# small pool of query_only reader connections that WAL lets run alongside it.
+_pool_lock = threading.Lock()
+_writers: dict[str, tuple[sqlite3.Connection, threading.RLock]] = {}
+_readers: dict[str, queue.LifoQueue] = {}
+_probes: dict[str, tuple[sqlite3.Connection, threading.Lock]] = {}
+
+def _open(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+def _close_all() -> None:
+    with _pool_lock:
+        for conn, lock in _writers.values():
+            with lock:
+                conn.close()
+        _writers.clear()
+        for pool in _readers.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+        _readers.clear()
+        for conn, lock in _probes.values():
+            with lock:
+                conn.close()
+        _probes.clear()
+
+# Closing cleanly lets the last connection checkpoint the WAL on shutdown.
+atexit.register(_close_all)
+
+# Paths whose schema has been created/migrated in this process.
+_schema_ready: set[str] = set()
+
+def _writer(db_path: str) -> tuple[sqlite3.Connection, threading.RLock]:
+    with _pool_lock:
+        entry = _writers.get(db_path)
+        if entry is None:
+            entry = (_open(db_path), threading.RLock())
+            _writers[db_path] = entry
+    return entry
+
+@contextmanager
+def _write_conn(db_path: str) -> Iterator[sqlite3.Connection]:
+    conn, lock = _writer(db_path)
+    with lock:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
 @contextmanager
 def connect(db_path: str = DEFAULT_DB_PATH) -> Iterator[sqlite3.Connection]:
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    init_db(db_path)
+    with _write_conn(db_path) as conn:
+        yield conn
+
+@contextmanager
+def connect_read(db_path: str = DEFAULT_DB_PATH) -> Iterator[sqlite3.Connection]:
+    init_db(db_path)
+    with _pool_lock:
+        pool = _readers.setdefault(db_path, queue.LifoQueue(maxsize=_READ_POOL_SIZE))
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _open(db_path)
+        conn.execute("PRAGMA query_only=ON;")
     try:
         yield conn
-        conn.commit()
     finally:
-        conn.close()
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
 
-def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
-    with connect(db_path) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        conn.execute("PRAGMA foreign_keys=ON;")
+# Stored in PRAGMA user_version once the DDL below has run; bump it whenever
+# the schema or its migrations change.
+_SCHEMA_VERSION = 2
 
+def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
+    if db_path in _schema_ready:
+        return
+    with _write_conn(db_path) as conn:
+        if conn.execute("PRAGMA user_version;").fetchone()[0] == _SCHEMA_VERSION:
+            _schema_ready.add(db_path)
+            return
         conn.execute("""
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -256,8 +368,22 @@ def init_db(db_path: str = DEFAULT_DB_PATH) -> None:
         );
         """)
 
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS mint_info (
+            mint TEXT PRIMARY KEY,
+            decimals INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        );
+        """)
+
+        conn.execute("DROP INDEX IF EXISTS idx_subs_channel_status;")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_subs_active_channel ON subscriptions(channel_id) WHERE status='ACTIVE';")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_status_created ON pending_trades(status, created_at);")
+        conn.execute("PRAGMA optimize;")
+        conn.execute(f"PRAGMA user_version={_SCHEMA_VERSION};")
+    _schema_ready.add(db_path)
+
 def smoke(db_path: str = DEFAULT_DB_PATH) -> None:
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute("INSERT OR IGNORE INTO users (telegram_user_id) VALUES (?)", ("12345",))
         conn.execute("INSERT OR IGNORE INTO channels (handle) VALUES (?)", ("@thewhitetest",))
@@ -283,53 +409,89 @@ def smoke(db_path: str = DEFAULT_DB_PATH) -> None:
 
         print(f"DB SMOKE OK: user={row['telegram_user_id']} channel={row['handle']} status={row['status']}")
 
+def _upsert_channel_id(conn: sqlite3.Connection, handle: str) -> int:
+    row = conn.execute(
+        """
+        INSERT INTO channels (handle) VALUES (?)
+        ON CONFLICT(handle) DO UPDATE SET handle=excluded.handle
+        RETURNING id
+        """,
+        (handle,),
+    ).fetchone()
+    return int(row["id"])
+
+def _upsert_user_id(conn: sqlite3.Connection, telegram_user_id: str) -> int:
+    row = conn.execute(
+        """
+        INSERT INTO users (telegram_user_id) VALUES (?)
+        ON CONFLICT(telegram_user_id) DO UPDATE SET telegram_user_id=excluded.telegram_user_id
+        RETURNING id
+        """,
+        (telegram_user_id,),
+    ).fetchone()
+    return int(row["id"])
+
+# Users and channels are never deleted, so their ids can be cached for the process.
+@lru_cache(maxsize=4096)
 def get_or_create_channel(handle: str, db_path: str = DEFAULT_DB_PATH) -> int:
-    init_db(db_path)
     with connect(db_path) as conn:
-        conn.execute("INSERT OR IGNORE INTO channels (handle) VALUES (?)", (handle,))
-        row = conn.execute("SELECT id FROM channels WHERE handle=?", (handle,)).fetchone()
-        return int(row["id"])
+        return _upsert_channel_id(conn, handle)
 
+@lru_cache(maxsize=4096)
 def get_or_create_user(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH) -> int:
-    init_db(db_path)
     with connect(db_path) as conn:
-        conn.execute("INSERT OR IGNORE INTO users (telegram_user_id) VALUES (?)", (telegram_user_id,))
-        row = conn.execute("SELECT id FROM users WHERE telegram_user_id=?", (telegram_user_id,)).fetchone()
-        return int(row["id"])
+        return _upsert_user_id(conn, telegram_user_id)
 
 def get_telegram_user_id(user_id: int, db_path: str = DEFAULT_DB_PATH) -> str | None:
-    init_db(db_path)
-    with connect(db_path) as conn:
+    with connect_read(db_path) as conn:
         row = conn.execute("SELECT telegram_user_id FROM users WHERE id=?", (int(user_id),)).fetchone()
         return str(row["telegram_user_id"]) if row else None
 
 def insert_message(channel_id: int, telegram_message_id: int, text: str, db_path: str = DEFAULT_DB_PATH) -> int:
-    init_db(db_path)
+    return insert_message_with_signals(channel_id, telegram_message_id, text, [], db_path=db_path)[0]
+
+def insert_message_with_signals(
+    channel_id: int,
+    telegram_message_id: int,
+    text: str,
+    signals: list[tuple[str, int]],
+    db_path: str = DEFAULT_DB_PATH,
+) -> tuple[int, list[int]]:
+    """
+    insert_message + insert_signal for each (mint, confidence), committed as one transaction.
+    """
     with connect(db_path) as conn:
-        conn.execute(
-            "INSERT OR IGNORE INTO messages (channel_id, telegram_message_id, text) VALUES (?, ?, ?)",
-            (channel_id, telegram_message_id, text),
-        )
         row = conn.execute(
-            "SELECT id FROM messages WHERE channel_id=? AND telegram_message_id=?",
-            (channel_id, telegram_message_id),
+            """
+            INSERT INTO messages (channel_id, telegram_message_id, text) VALUES (?, ?, ?)
+            ON CONFLICT(channel_id, telegram_message_id) DO UPDATE SET channel_id=excluded.channel_id
+            RETURNING id
+            """,
+            (channel_id, telegram_message_id, text),
         ).fetchone()
-        return int(row["id"])
+        message_id = int(row["id"])
+        signal_ids = [
+            int(conn.execute(
+                "INSERT INTO signals (channel_id, message_id, mint, confidence) VALUES (?, ?, ?, ?)",
+                (channel_id, message_id, mint, confidence),
+            ).lastrowid)
+            for mint, confidence in signals
+        ]
+        return message_id, signal_ids
 
 def insert_signal(channel_id: int, message_id: int, mint: str, confidence: int, db_path: str = DEFAULT_DB_PATH) -> int:
-    init_db(db_path)
     with connect(db_path) as conn:
-        conn.execute(
+        cur = conn.execute(
             "INSERT INTO signals (channel_id, message_id, mint, confidence) VALUES (?, ?, ?, ?)",
             (channel_id, message_id, mint, confidence),
         )
-        return int(conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"])
+        return int(cur.lastrowid)
 
 def upsert_subscription(telegram_user_id: str, channel_handle: str, status: str = "ACTIVE", db_path: str = DEFAULT_DB_PATH) -> None:
-    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    channel_id = get_or_create_channel(channel_handle, db_path=db_path)
-    init_db(db_path)
+    # User, channel and subscription in one transaction.
     with connect(db_path) as conn:
+        user_id = _upsert_user_id(conn, telegram_user_id)
+        channel_id = _upsert_channel_id(conn, channel_handle)
         conn.execute(
             """
             INSERT INTO subscriptions (user_id, channel_id, status)
@@ -339,28 +501,24 @@ def upsert_subscription(telegram_user_id: str, channel_handle: str, status: str
             (user_id, channel_id, status),
         )
 
-def list_subscriptions(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
-    with connect(db_path) as conn:
-        user = conn.execute("SELECT id FROM users WHERE telegram_user_id=?", (telegram_user_id,)).fetchone()
-        if not user:
-            return []
-        rows = conn.execute(
+def list_subscriptions(telegram_user_id: str, limit: int | None = None, db_path: str = DEFAULT_DB_PATH):
+    with connect_read(db_path) as conn:
+        return conn.execute(
             """
             SELECT c.handle, s.status, s.created_at
-            FROM subscriptions s
+            FROM users u
+            JOIN subscriptions s ON s.user_id = u.id
             JOIN channels c ON c.id = s.channel_id
-            WHERE s.user_id=? AND s.status!='DELETED'
+            WHERE u.telegram_user_id=? AND s.status!='DELETED'
             ORDER BY c.handle
+            LIMIT ?
             """,
-            (user["id"],),
+            (telegram_user_id, -1 if limit is None else int(limit)),
         ).fetchall()
-        return rows
 
 def upsert_channel_settings(telegram_user_id: str, channel_handle: str, updates: dict, db_path: str = DEFAULT_DB_PATH):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
     channel_id = get_or_create_channel(channel_handle, db_path=db_path)
-    init_db(db_path)
 
     allowed = {
         "buy_amount_sol","buy_slippage_pct","sell_slippage_pct","gas_fee_sol",
@@ -389,8 +547,7 @@ def upsert_channel_settings(telegram_user_id: str, channel_handle: str, updates:
 
 def get_channel_settings(telegram_user_id: str, channel_handle: str, db_path: str = DEFAULT_DB_PATH):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
-    with connect(db_path) as conn:
+    with connect_read(db_path) as conn:
         row = conn.execute(
             """
             SELECT cs.*
@@ -404,7 +561,6 @@ def get_channel_settings(telegram_user_id: str, channel_handle: str, db_path: st
 
 def clear_channel_settings(telegram_user_id: str, channel_handle: str, db_path: str = DEFAULT_DB_PATH):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute(
             """
@@ -424,27 +580,57 @@ def get_effective_settings(telegram_user_id: str, channel_handle: str, db_path:
             base[key] = val
     return base
 
+# Active subscribers per (db_path, handle), tagged with the PRAGMA data_version
+# they were read at. The value is per connection and moves on any commit made
+# through another connection, so it is read from a dedicated probe connection:
+# that way writes from this process's writer (subscriptions, users, channels,
+# wallets alike) invalidate the cache too. The probe never takes the writer
+# lock, so a cache check can't stall behind a BEGIN IMMEDIATE.
+_active_subs_cache: dict[tuple[str, str], tuple[int, list[str]]] = {}
+
+def _subscribers_version(db_path: str) -> int:
+    with _pool_lock:
+        entry = _probes.get(db_path)
+        if entry is None:
+            entry = (_open(db_path), threading.Lock())
+            _probes[db_path] = entry
+    conn, lock = entry
+    with lock:
+        return conn.execute("PRAGMA data_version;").fetchone()[0]
+
 def active_subscribers_for_channel(channel_handle: str, db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
-    with connect(db_path) as conn:
-        chan = conn.execute("SELECT id FROM channels WHERE handle=?", (channel_handle,)).fetchone()
-        if not chan:
-            return []
-        rows = conn.execute(
+    version = _subscribers_version(db_path)
+    hit = _active_subs_cache.get((db_path, channel_handle))
+    if hit and hit[0] == version:
+        return list(hit[1])
+    with connect_read(db_path) as conn:
+        cur = conn.cursor()
+        cur.row_factory = None  # single column: plain tuples, no Row objects
+        rows = cur.execute(
             """
             SELECT u.telegram_user_id
             FROM subscriptions s
+            JOIN channels c ON c.id = s.channel_id
             JOIN users u ON u.id = s.user_id
             JOIN wallets w ON w.user_id = u.id
-            WHERE s.channel_id=? AND s.status='ACTIVE'
+            WHERE c.handle=? AND s.status='ACTIVE'
             """,
-            (chan["id"],),
+            (channel_handle,),
         ).fetchall()
-        return [r["telegram_user_id"] for r in rows]
+    users = [r[0] for r in rows]
+    _active_subs_cache[(db_path, channel_handle)] = (version, users)
+    return list(users)
+
+def clear_caches() -> None:
+    """
+    Forget cached user/channel ids and subscriber lists, e.g. after swapping the database file.
+    """
+    get_or_create_user.cache_clear()
+    get_or_create_channel.cache_clear()
+    _active_subs_cache.clear()
 
 def list_active_channels(db_path: str = DEFAULT_DB_PATH) -> list[str]:
-    init_db(db_path)
-    with connect(db_path) as conn:
+    with connect_read(db_path) as conn:
         rows = conn.execute(
             """
             SELECT DISTINCT c.handle
@@ -457,7 +643,6 @@ def list_active_channels(db_path: str = DEFAULT_DB_PATH) -> list[str]:
         return [r["handle"] for r in rows]
 
 def update_listener_heartbeat(db_path: str = DEFAULT_DB_PATH) -> None:
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute(
             """
@@ -468,13 +653,11 @@ def update_listener_heartbeat(db_path: str = DEFAULT_DB_PATH) -> None:
         )
 
 def get_listener_last_seen(db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
-    with connect(db_path) as conn:
+    with connect_read(db_path) as conn:
         row = conn.execute("SELECT last_seen FROM listener_status WHERE id=1").fetchone()
         return row["last_seen"] if row else None
 
 def cleanup_subscriptions_without_wallet(db_path: str = DEFAULT_DB_PATH) -> int:
-    init_db(db_path)
     with connect(db_path) as conn:
         cur = conn.execute(
             """
@@ -483,86 +666,135 @@ def cleanup_subscriptions_without_wallet(db_path: str = DEFAULT_DB_PATH) -> int:
               AND status!='DELETED'
             """
         )
-        return cur.rowcount
+    return cur.rowcount
 
 def ensure_user_settings(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH) -> None:
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute("INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)", (user_id,))
 
-def update_user_settings(telegram_user_id: str, updates: dict, db_path: str = DEFAULT_DB_PATH) -> None:
-    ensure_user_settings(telegram_user_id, db_path=db_path)
-    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
+_USER_SETTINGS_KEYS = (
+    "trade_mode","position_mode","max_open_positions",
+    "buy_amount_sol","buy_slippage_pct","sell_slippage_pct","gas_fee_sol",
+    "tp_sl_enabled","take_profit_pct","stop_loss_pct",
+    "max_marketcap_sol","min_holders","degen_mode",
+    "cooldown_seconds","max_trades_per_day","duplicate_mint_block",
+    "auto_buy_enabled","confirm_tx_enabled",
+    "buy_presets_sol","sell_presets_pct",
+)
+_USER_SETTINGS_ALLOWED = frozenset(_USER_SETTINGS_KEYS)
+
+# One statement for any subset of keys: columns absent from the JSON patch keep
+# their value (json_type is NULL for a missing key, 'null' for an explicit None).
+_UPDATE_USER_SETTINGS_SQL = (
+    "UPDATE user_settings SET "
+    + ", ".join(
+        f"{k}=CASE WHEN json_type(:patch, '$.{k}') IS NULL THEN {k} ELSE json_extract(:patch, '$.{k}') END"
+        for k in _USER_SETTINGS_KEYS
+    )
+    + ", updated_at=CURRENT_TIMESTAMP WHERE user_id=:user_id"
+)
 
-    allowed = {
-        "trade_mode","position_mode","max_open_positions",
-        "buy_amount_sol","buy_slippage_pct","sell_slippage_pct","gas_fee_sol",
-        "tp_sl_enabled","take_profit_pct","stop_loss_pct",
-        "max_marketcap_sol","min_holders","degen_mode",
-        "cooldown_seconds","max_trades_per_day","duplicate_mint_block",
-        "auto_buy_enabled","confirm_tx_enabled",
-        "buy_presets_sol","sell_presets_pct",
-    }
-    bad = [k for k in updates.keys() if k not in allowed]
+def update_user_settings(telegram_user_id: str, updates: dict, db_path: str = DEFAULT_DB_PATH) -> None:
+    bad = [k for k in updates if k not in _USER_SETTINGS_ALLOWED]
     if bad:
         raise ValueError(f"Unknown settings keys: {bad}")
 
-    sets = ", ".join([f"{k}=?" for k in updates.keys()])
-    vals = list(updates.values())
-    vals.append(user_id)
-
-    init_db(db_path)
+    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
     with connect(db_path) as conn:
-        conn.execute(
-            f"UPDATE user_settings SET {sets}, updated_at=CURRENT_TIMESTAMP WHERE user_id=?",
-            vals,
-        )
+        conn.execute("INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)", (user_id,))
+        conn.execute(_UPDATE_USER_SETTINGS_SQL, {"patch": json.dumps(updates), "user_id": user_id})
+
+# Numeric user_settings columns, coerced once here so callers get typed values.
+_SETTINGS_FLOAT = (
+    "buy_amount_sol", "buy_slippage_pct", "sell_slippage_pct", "gas_fee_sol",
+    "take_profit_pct", "stop_loss_pct", "max_marketcap_sol",
+)
+_SETTINGS_INT = (
+    "max_open_positions", "tp_sl_enabled", "min_holders", "degen_mode", "cooldown_seconds",
+    "max_trades_per_day", "duplicate_mint_block", "auto_buy_enabled", "confirm_tx_enabled",
+)
+
+_SELECT_USER_SETTINGS_SQL = f"SELECT {', '.join(_USER_SETTINGS_KEYS)} FROM user_settings WHERE user_id=?"
 
 def get_user_settings(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH):
-    ensure_user_settings(telegram_user_id, db_path=db_path)
-    init_db(db_path)
-    with connect(db_path) as conn:
-        user = conn.execute("SELECT id FROM users WHERE telegram_user_id=?", (telegram_user_id,)).fetchone()
-        row = conn.execute("SELECT * FROM user_settings WHERE user_id=?", (user["id"],)).fetchone()
-        return dict(row)
+    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
+    with connect_read(db_path) as conn:
+        row = conn.execute(_SELECT_USER_SETTINGS_SQL, (user_id,)).fetchone()
+    if row is None:
+        with connect(db_path) as conn:
+            conn.execute("INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)", (user_id,))
+            row = conn.execute(_SELECT_USER_SETTINGS_SQL, (user_id,)).fetchone()
+    s = dict(row)
+    for k in _SETTINGS_FLOAT:
+        if s.get(k) is not None:
+            s[k] = float(s[k])
+    for k in _SETTINGS_INT:
+        if s.get(k) is not None:
+            s[k] = int(s[k])
+    return s
 
 def insert_trade_intent(telegram_user_id: str, channel_handle: str, signal_id: int, mint: str,
                         intent_type: str = "AUTO_BUY", status: str = "PENDING", reason: str | None = None,
                         db_path: str = DEFAULT_DB_PATH) -> int:
-    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    channel_id = get_or_create_channel(channel_handle, db_path=db_path)
-
-    init_db(db_path)
+    return insert_trade_intents_bulk(
+        [telegram_user_id], channel_handle, signal_id, mint,
+        intent_type=intent_type, status=status, reason=reason, db_path=db_path,
+    )[0]
+
+def insert_trade_intents_bulk(telegram_user_ids: list[str], channel_handle: str, signal_id: int, mint: str,
+                              intent_type: str = "AUTO_BUY", status: str = "PENDING", reason: str | None = None,
+                              db_path: str = DEFAULT_DB_PATH) -> list[int]:
+    """
+    Fan one signal out to many subscribers: users, channel and intents in one transaction.
+    """
+    if not telegram_user_ids:
+        return []
     with connect(db_path) as conn:
-        conn.execute(
-            """
-            INSERT INTO trade_intents (user_id, channel_id, signal_id, mint, intent_type, status, reason)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, channel_id, signal_id, mint, intent_type, status, reason),
+        channel_id = _upsert_channel_id(conn, channel_handle)
+        conn.executemany(
+            "INSERT OR IGNORE INTO users (telegram_user_id) VALUES (?)",
+            [(u,) for u in telegram_user_ids],
         )
-        return int(conn.execute("SELECT last_insert_rowid() AS id").fetchone()["id"])
+        marks = ",".join("?" * len(telegram_user_ids))
+        user_ids = {
+            r["telegram_user_id"]: r["id"]
+            for r in conn.execute(
+                f"SELECT id, telegram_user_id FROM users WHERE telegram_user_id IN ({marks})",
+                list(telegram_user_ids),
+            )
+        }
+        ids = []
+        for u in telegram_user_ids:
+            cur = conn.execute(
+                """
+                INSERT INTO trade_intents (user_id, channel_id, signal_id, mint, intent_type, status, reason)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (user_ids[u], channel_id, signal_id, mint, intent_type, status, reason),
+            )
+            ids.append(int(cur.lastrowid))
+        return ids
 
 def tail_trade_intents(n: int = 20, db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
-    with connect(db_path) as conn:
-        rows = conn.execute(
+    with connect_read(db_path) as conn:
+        cur = conn.execute(
             """
-            SELECT ti.id, u.telegram_user_id, c.handle, ti.mint, ti.intent_type, ti.status, ti.reason, ti.created_at
-            FROM trade_intents ti
-            JOIN users u ON u.id = ti.user_id
-            JOIN channels c ON c.id = ti.channel_id
-            ORDER BY ti.id DESC
-            LIMIT ?
+            SELECT * FROM (
+                SELECT ti.id, u.telegram_user_id, c.handle, ti.mint, ti.intent_type, ti.status, ti.reason, ti.created_at
+                FROM trade_intents ti
+                JOIN users u ON u.id = ti.user_id
+                JOIN channels c ON c.id = ti.channel_id
+                ORDER BY ti.id DESC
+                LIMIT ?
+            ) ORDER BY id ASC
             """,
             (n,),
-        ).fetchall()
-        return [dict(r) for r in rows]
+        )
+        return cur.fetchall()
 
 def get_position(telegram_user_id: str, mint: str, db_path: str = DEFAULT_DB_PATH):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute(
             "DELETE FROM positions WHERE user_id=? AND (open=0 OR token_balance<=0)",
@@ -580,7 +812,6 @@ def get_position(telegram_user_id: str, mint: str, db_path: str = DEFAULT_DB_PAT
 
 def list_positions(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute(
             "DELETE FROM positions WHERE user_id=? AND (open=0 OR token_balance<=0)",
@@ -597,6 +828,97 @@ def list_positions(telegram_user_id: str, db_path: str = DEFAULT_DB_PATH):
         ).fetchall()
         return [dict(r) for r in rows]
 
+def _apply_trade_rows(conn, user_id: int, mint: str, side: str, token_amount: float, sol_amount: float, tx_sig):
+    epsilon = 1e-9
+    row = conn.execute(
+        """
+        SELECT *
+        FROM positions
+        WHERE user_id=? AND mint=?
+        """,
+        (user_id, mint),
+    ).fetchone()
+
+    token_balance = float(row["token_balance"]) if row else 0.0
+    avg_entry = float(row["avg_entry_sol"]) if row else 0.0
+    total_spent = float(row["total_sol_spent"]) if row else 0.0
+    total_received = float(row["total_sol_received"]) if row else 0.0
+    realized_pnl = float(row["realized_pnl_sol"]) if row else 0.0
+
+    if side == "BUY":
+        new_balance = token_balance + token_amount
+        new_total_spent = total_spent + sol_amount
+        new_avg_entry = new_total_spent / new_balance if new_balance > 0 else 0.0
+        new_total_received = total_received
+        new_realized_pnl = realized_pnl
+        open_flag = 1
+    else:
+        if token_balance <= 0:
+            raise ValueError("No open position to sell")
+        if token_amount > token_balance:
+            raise ValueError("Cannot sell more than current token balance")
+
+        pnl = sol_amount - (token_amount * avg_entry)
+        new_balance = token_balance - token_amount
+        new_total_spent = total_spent
+        new_total_received = total_received + sol_amount
+        new_realized_pnl = realized_pnl + pnl
+        close_threshold = max(epsilon, 500.0)
+        if new_balance <= close_threshold:
+            new_balance = 0.0
+            new_avg_entry = 0.0
+            open_flag = 0
+        else:
+            new_avg_entry = avg_entry
+            open_flag = 1
+
+    price = sol_amount / token_amount
+    conn.execute(
+        """
+        INSERT INTO trades (user_id, mint, side, token_amount, sol_amount, price_sol_per_token, tx_sig)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (user_id, mint, side, token_amount, sol_amount, price, tx_sig),
+    )
+
+    if row:
+        if open_flag == 0:
+            conn.execute(
+                "DELETE FROM positions WHERE user_id=? AND mint=?",
+                (user_id, mint),
+            )
+        else:
+            conn.execute(
+                """
+                UPDATE positions
+                SET token_balance=?, avg_entry_sol=?, total_sol_spent=?, total_sol_received=?,
+                    realized_pnl_sol=?, open=?, updated_at=CURRENT_TIMESTAMP
+                WHERE user_id=? AND mint=?
+                """,
+                (
+                    new_balance, new_avg_entry, new_total_spent, new_total_received,
+                    new_realized_pnl, open_flag, user_id, mint,
+                ),
+            )
+    else:
+        conn.execute(
+            """
+            INSERT INTO positions (user_id, mint, token_balance, avg_entry_sol, total_sol_spent,
+                                   total_sol_received, realized_pnl_sol, open)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                user_id, mint, new_balance, new_avg_entry, new_total_spent,
+                new_total_received, new_realized_pnl, open_flag,
+            ),
+        )
+
+    row = conn.execute(
+        "SELECT * FROM positions WHERE user_id=? AND mint=?",
+        (user_id, mint),
+    ).fetchone()
+    return dict(row) if row else None
+
 def apply_trade(
     telegram_user_id: str,
     mint: str,
@@ -606,7 +928,6 @@ def apply_trade(
     tx_sig: str | None = None,
     db_path: str = DEFAULT_DB_PATH,
 ):
-    epsilon = 1e-9
     if token_amount <= 0 or sol_amount <= 0:
         raise ValueError("token_amount and sol_amount must be positive")
 
@@ -615,97 +936,9 @@ def apply_trade(
         raise ValueError("side must be BUY or SELL")
 
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
 
     with connect(db_path) as conn:
-        row = conn.execute(
-            """
-            SELECT *
-            FROM positions
-            WHERE user_id=? AND mint=?
-            """,
-            (user_id, mint),
-        ).fetchone()
-
-        token_balance = float(row["token_balance"]) if row else 0.0
-        avg_entry = float(row["avg_entry_sol"]) if row else 0.0
-        total_spent = float(row["total_sol_spent"]) if row else 0.0
-        total_received = float(row["total_sol_received"]) if row else 0.0
-        realized_pnl = float(row["realized_pnl_sol"]) if row else 0.0
-
-        if side == "BUY":
-            new_balance = token_balance + token_amount
-            new_total_spent = total_spent + sol_amount
-            new_avg_entry = new_total_spent / new_balance if new_balance > 0 else 0.0
-            new_total_received = total_received
-            new_realized_pnl = realized_pnl
-            open_flag = 1
-        else:
-            if token_balance <= 0:
-                raise ValueError("No open position to sell")
-            if token_amount > token_balance:
-                raise ValueError("Cannot sell more than current token balance")
-
-            pnl = sol_amount - (token_amount * avg_entry)
-            new_balance = token_balance - token_amount
-            new_total_spent = total_spent
-            new_total_received = total_received + sol_amount
-            new_realized_pnl = realized_pnl + pnl
-            close_threshold = max(epsilon, 500.0)
-            if new_balance <= close_threshold:
-                new_balance = 0.0
-                new_avg_entry = 0.0
-                open_flag = 0
-            else:
-                new_avg_entry = avg_entry
-                open_flag = 1
-
-        price = sol_amount / token_amount
-        conn.execute(
-            """
-            INSERT INTO trades (user_id, mint, side, token_amount, sol_amount, price_sol_per_token, tx_sig)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (user_id, mint, side, token_amount, sol_amount, price, tx_sig),
-        )
-
-        if row:
-            if open_flag == 0:
-                conn.execute(
-                    "DELETE FROM positions WHERE user_id=? AND mint=?",
-                    (user_id, mint),
-                )
-            else:
-                conn.execute(
-                    """
-                    UPDATE positions
-                    SET token_balance=?, avg_entry_sol=?, total_sol_spent=?, total_sol_received=?,
-                        realized_pnl_sol=?, open=?, updated_at=CURRENT_TIMESTAMP
-                    WHERE user_id=? AND mint=?
-                    """,
-                    (
-                        new_balance, new_avg_entry, new_total_spent, new_total_received,
-                        new_realized_pnl, open_flag, user_id, mint,
-                    ),
-                )
-        else:
-            conn.execute(
-                """
-                INSERT INTO positions (user_id, mint, token_balance, avg_entry_sol, total_sol_spent,
-                                       total_sol_received, realized_pnl_sol, open)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    user_id, mint, new_balance, new_avg_entry, new_total_spent,
-                    new_total_received, new_realized_pnl, open_flag,
-                ),
-            )
-
-        row = conn.execute(
-            "SELECT * FROM positions WHERE user_id=? AND mint=?",
-            (user_id, mint),
-        ).fetchone()
-        return dict(row) if row else None
+        return _apply_trade_rows(conn, user_id, mint, side, token_amount, sol_amount, tx_sig)
 
 def enqueue_pending_trade(
     telegram_user_id: str,
@@ -721,7 +954,6 @@ def enqueue_pending_trade(
         raise ValueError("side must be BUY or SELL")
 
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         conn.execute(
             """
@@ -737,6 +969,16 @@ def enqueue_pending_trade(
             (user_id, mint, side, signature, requested_token_amount, requested_sol_amount),
         )
 
+def _set_pending_trade_status(conn, signature, status, error, actual_token_amount, actual_sol_amount) -> None:
+    conn.execute(
+        """
+        UPDATE pending_trades
+        SET status=?, error=?, actual_token_amount=?, actual_sol_amount=?, updated_at=CURRENT_TIMESTAMP
+        WHERE signature=?
+        """,
+        (status, error, actual_token_amount, actual_sol_amount, signature),
+    )
+
 def update_pending_trade_status(
     signature: str,
     status: str,
@@ -749,20 +991,37 @@ def update_pending_trade_status(
     if status not in ("PENDING", "SUCCESS", "FAILED"):
         raise ValueError("status must be PENDING, SUCCESS, or FAILED")
 
-    init_db(db_path)
     with connect(db_path) as conn:
-        conn.execute(
-            """
-            UPDATE pending_trades
-            SET status=?, error=?, actual_token_amount=?, actual_sol_amount=?, updated_at=CURRENT_TIMESTAMP
-            WHERE signature=?
-            """,
-            (status, error, actual_token_amount, actual_sol_amount, signature),
-        )
+        _set_pending_trade_status(conn, signature, status, error, actual_token_amount, actual_sol_amount)
+
+def apply_trade_and_finalize(
+    telegram_user_id: str,
+    mint: str,
+    side: str,
+    token_amount: float,
+    sol_amount: float,
+    signature: str,
+    db_path: str = DEFAULT_DB_PATH,
+):
+    """
+    apply_trade + mark the pending trade SUCCESS, committed as one transaction.
+    """
+    if token_amount <= 0 or sol_amount <= 0:
+        raise ValueError("token_amount and sol_amount must be positive")
+
+    side = side.strip().upper()
+    if side not in ("BUY", "SELL"):
+        raise ValueError("side must be BUY or SELL")
+
+    user_id = get_or_create_user(telegram_user_id, db_path=db_path)
 
-def list_pending_trades(status: str | None = "PENDING", limit: int = 50, db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
     with connect(db_path) as conn:
+        row = _apply_trade_rows(conn, user_id, mint, side, token_amount, sol_amount, signature)
+        _set_pending_trade_status(conn, signature, "SUCCESS", None, token_amount, sol_amount)
+        return row
+
+def list_pending_trades(status: str | None = "PENDING", limit: int = 50, db_path: str = DEFAULT_DB_PATH):
+    with connect_read(db_path) as conn:
         if status:
             rows = conn.execute(
                 """
@@ -785,8 +1044,7 @@ def list_pending_trades(status: str | None = "PENDING", limit: int = 50, db_path
         return [dict(r) for r in rows]
 
 def get_pending_trade(signature: str, db_path: str = DEFAULT_DB_PATH):
-    init_db(db_path)
-    with connect(db_path) as conn:
+    with connect_read(db_path) as conn:
         row = conn.execute(
             "SELECT * FROM pending_trades WHERE signature=?",
             (signature,),
@@ -800,7 +1058,6 @@ def reconcile_position_balance(
     db_path: str = DEFAULT_DB_PATH,
 ):
     user_id = get_or_create_user(telegram_user_id, db_path=db_path)
-    init_db(db_path)
     with connect(db_path) as conn:
         close_threshold = 500.0
         if token_balance <= close_threshold:
@@ -817,3 +1074,15 @@ def reconcile_position_balance(
             """,
             (token_balance, user_id, mint),
         )
+
+def get_mint_decimals(mint: str, db_path: str = DEFAULT_DB_PATH) -> int | None:
+    with connect_read(db_path) as conn:
+        row = conn.execute("SELECT decimals FROM mint_info WHERE mint=?", (mint,)).fetchone()
+        return int(row["decimals"]) if row else None
+
+def set_mint_decimals(mint: str, decimals: int, db_path: str = DEFAULT_DB_PATH) -> None:
+    with connect(db_path) as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO mint_info (mint, decimals) VALUES (?, ?)",
+            (mint, int(decimals)),
+        )
@@ -7,7 +7,7 @@ from typing import Optional, Any
 
 from solders.pubkey import Pubkey
 
-from .solana_rpc import get_client, try_get_mint_decimals
+from .solana_rpc import get_client, sol_to_lamports, try_get_mint_decimals
 
 
 # Pump.fun program id (mainnet) per Solscan
@@ -152,7 +152,7 @@ def quote_buy_pumpfun(mint: str, sol_in: float, fee_bps: int = 0) -> PumpQuoteBu
 
     NOTE: fee_bps default 0 for now; later we can fetch pump Global and apply real fee.
     """
-    lamports_in = int(sol_in * 1_000_000_000)
+    lamports_in = sol_to_lamports(sol_in)
     fee_lamports = (lamports_in * int(fee_bps)) // 10_000
     x = max(0, lamports_in - fee_lamports)
 
@@ -15,9 +15,9 @@ from solders.message import MessageV0
 from solders.transaction import VersionedTransaction
 from solders.system_program import ID as SYS_PROGRAM_ID
 
-from .solana_rpc import get_http_client, rpc_get_latest_blockhash, rpc_get_multiple_accounts, _rpc_url
+from .solana_rpc import get_http_client, rpc_get_latest_blockhash, rpc_get_multiple_accounts, sol_to_lamports, _rpc_url
 from .pump_quotes import quote_buy_pumpfun
-from .wallets import wallet_get_keypair  # must exist in your wallets.py
+from .wallets import wallet_get_keypair, wallet_get_pubkey  # must exist in your wallets.py
 
 
 # -----------------------
@@ -115,14 +115,16 @@ class PumpBuyPlan:
 
 
 def build_buy_ix_and_plan(
-    user_keypair: Keypair,
+    user_keypair: Optional[Keypair],
     mint_str: str,
     sol_in: float,
     slippage_pct: float,
+    user_pubkey: Optional[Pubkey] = None,
 ) -> Tuple[PumpBuyPlan, Instruction]:
     """
     Builds the Pump.fun BUY instruction with the exact account order from your scalper.
     Uses quote_buy_pumpfun() for curve/creator/tokens_out estimate.
+    Dry runs that never sign can pass user_pubkey instead of a keypair.
     """
     q = quote_buy_pumpfun(mint_str, sol_in=sol_in, fee_bps=0)
 
@@ -130,14 +132,14 @@ def build_buy_ix_and_plan(
     token_program = Pubkey.from_string(_fetch_mint_owner_program(mint_str))
     curve = Pubkey.from_string(q.curve_pda)
     curve_ata = _get_associated_token_address(curve, mint, token_program)
-    user = user_keypair.pubkey()
+    user = user_pubkey if user_pubkey is not None else user_keypair.pubkey()
     user_ata = _get_associated_token_address(user, mint, token_program)
 
     creator = Pubkey.from_string(q.creator)
     creator_vault = _get_creator_vault_pda(creator)
     uva = _get_user_volume_accumulator(user)
 
-    sol_lamports = int(sol_in * 1_000_000_000)
+    sol_lamports = sol_to_lamports(sol_in)
     max_sol = int(sol_lamports * (1.0 + (slippage_pct / 100.0)))
 
     amount_out = int(q.est_tokens_out_raw)
@@ -260,6 +262,14 @@ def load_keypair_for_user(telegram_user_id: str) -> Keypair:
     return wallet_get_keypair(telegram_user_id)
 
 
+def load_pubkey_for_user(telegram_user_id: str) -> Pubkey:
+    # Public key only: no password prompt or seed decryption.
+    pub = wallet_get_pubkey(telegram_user_id)
+    if not pub:
+        raise ValueError("Wallet not found for user")
+    return Pubkey.from_string(pub)
+
+
 def send_buy_tx(user_keypair: Keypair, mint_str: str, sol_in: float, slippage_pct: float):
     """
     Build and SEND a Pump.fun buy transaction.
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Fail if any scrapetech module defines the same top-level function or class twice
+(a later def silently shadows the earlier one).
+
+Usage: python scrapetech/scripts/check_duplicate_defs.py
+"""
+import ast
+import sys
+from collections import Counter
+from pathlib import Path
+
+PKG = Path(__file__).resolve().parent.parent
+
+
+def main() -> int:
+    failed = False
+    for path in sorted(PKG.rglob("*.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        names = Counter(
+            node.name
+            for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        )
+        for name, count in sorted(names.items()):
+            if count > 1:
+                print(f"{path.relative_to(PKG.parent)}: {name} defined {count} times")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
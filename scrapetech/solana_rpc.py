@@ -1,10 +1,13 @@
 import os
 from dataclasses import dataclass
+from decimal import Decimal
 from typing import Optional, Tuple
 
 from solana.rpc.api import Client
 from solders.pubkey import Pubkey
 
+from .db import get_mint_decimals, set_mint_decimals
+
 LAMPORTS_PER_SOL = 1_000_000_000
 TOKEN_PROGRAM_ID = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
 TOKEN_2022_PROGRAM_ID = "TokenzQdYmf8s5w1Qx9r1v6A9F9Fj7X1n1rX5Yp4sQj"
@@ -24,6 +27,10 @@ def get_client() -> Client:
     # Backwards-compatible alias used by quote modules
     return rpc_client()
 
+def sol_to_lamports(sol: float) -> int:
+    # Go through the decimal repr so e.g. 2.01 SOL is 2010000000, not 2009999999.
+    return int(Decimal(str(sol)) * LAMPORTS_PER_SOL)
+
 def sol_balance(pubkey_str: str) -> Tuple[int, float]:
     c = rpc_client()
     pub = Pubkey.from_string(pubkey_str)
@@ -153,26 +160,59 @@ def get_account_data_bytes(pubkey_str: str) -> bytes | None:
         return None
 
 
+# Mint decimals never change, so remember them in-process and in the DB.
+_MINT_DECIMALS: dict[str, int] = {}
+
 def try_get_mint_decimals(mint_str: str) -> int | None:
-    data = get_account_data_bytes(mint_str)
-    if not data or len(data) < 45:
-        return None
-    # SPL mint decimals is at byte 44 (after mint authority option + key + supply)
-    # This holds for classic mint layout; token-2022 base region keeps it in same spot.
-    return int(data[44])
+    decimals = _MINT_DECIMALS.get(mint_str)
+    if decimals is not None:
+        return decimals
+    decimals = get_mint_decimals(mint_str)
+    if decimals is None:
+        data = get_account_data_bytes(mint_str)
+        if not data or len(data) < 45:
+            return None
+        # SPL mint decimals is at byte 44 (after mint authority option + key + supply)
+        # This holds for classic mint layout; token-2022 base region keeps it in same spot.
+        decimals = int(data[44])
+        set_mint_decimals(mint_str, decimals)
+    _MINT_DECIMALS[mint_str] = decimals
+    return decimals
 
 # -----------------------------
 # Added helpers for pump_tx.py
 # -----------------------------
+import asyncio
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
 import httpx
+import orjson
 from typing import List, Optional, Any, Dict
 
+@cache
 def get_http_client() -> httpx.Client:
     """
     Shared synchronous httpx client for JSON-RPC calls.
+
+    Built once per process so repeated calls (e.g. every reconcile tick) reuse
+    the same keep-alive pool instead of paying a fresh TLS handshake.
     """
-    return httpx.Client(timeout=30.0)
+    return httpx.Client(
+        timeout=30.0,
+        transport=httpx.HTTPTransport(
+            http2=True,
+            retries=1,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+        ),
+    )
+
+def get_async_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=30.0)
+
+_MULTIPLE_ACCOUNTS_MAX = 100
+_BATCH_MAX = 50
 
 def _rpc_url() -> str:
     url = os.getenv("SOLANA_RPC_URL", "").strip()
@@ -180,6 +220,22 @@ def _rpc_url() -> str:
         raise ValueError("SOLANA_RPC_URL not set")
     return url
 
+# Request bodies are encoded and responses decoded with orjson; getTransaction
+# and getMultipleAccounts payloads are large enough for the stdlib parser to show.
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+def _rpc_call(client: httpx.Client, method: str, params: Any) -> Dict[str, Any]:
+    body = orjson.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+    r = client.post(_rpc_url(), content=body, headers=_JSON_HEADERS)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
+async def _rpc_call_async(client: httpx.AsyncClient, method: str, params: Any) -> Dict[str, Any]:
+    body = orjson.dumps({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+    r = await client.post(_rpc_url(), content=body, headers=_JSON_HEADERS)
+    r.raise_for_status()
+    return orjson.loads(r.content)
+
 def rpc_get_latest_blockhash(client: httpx.Client) -> str:
     r = client.post(
         _rpc_url(),
@@ -189,63 +245,168 @@ def rpc_get_latest_blockhash(client: httpx.Client) -> str:
     j = r.json()
     return j["result"]["value"]["blockhash"]
 
-def rpc_get_multiple_accounts(client: httpx.Client, pubkeys: List[str]) -> List[Optional[Dict[str, Any]]]:
+def _get_multiple_accounts_chunk(client: httpx.Client, pubkeys: List[str]) -> List[Optional[Dict[str, Any]]]:
+    j = _rpc_call(client, "getMultipleAccounts", [pubkeys, {"encoding": "base64"}])
+    vals = j["result"]["value"]
+    return vals + [None] * (len(pubkeys) - len(vals))
+
+def rpc_get_multiple_accounts(
+    client: httpx.Client, pubkeys: List[str], max_concurrency: int = 8
+) -> List[Optional[Dict[str, Any]]]:
     """
     Returns list of account objects or None for missing accounts.
     Uses base64 encoding.
+    getMultipleAccounts takes at most 100 keys, so longer lists are split and
+    the chunks fetched in parallel (up to max_concurrency at once).
     """
-    r = client.post(
-        _rpc_url(),
-        json={
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getMultipleAccounts",
-            "params": [pubkeys, {"encoding": "base64"}],
-        },
-    )
-    r.raise_for_status()
-    j = r.json()
-    vals = j["result"]["value"]
-    out: List[Optional[Dict[str, Any]]] = []
-    for v in vals:
-        out.append(v)  # v is dict or None
+    chunks = [pubkeys[i : i + _MULTIPLE_ACCOUNTS_MAX] for i in range(0, len(pubkeys), _MULTIPLE_ACCOUNTS_MAX)]
+    if len(chunks) <= 1:
+        return _get_multiple_accounts_chunk(client, pubkeys)
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as pool:
+        parts = pool.map(lambda chunk: _get_multiple_accounts_chunk(client, chunk), chunks)
+        return [v for part in parts for v in part]
+
+def _tx_opts(commitment: str | None) -> Dict[str, Any]:
+    opts: Dict[str, Any] = {
+        "encoding": "jsonParsed",
+        "maxSupportedTransactionVersion": 0,
+    }
+    if commitment:
+        opts["commitment"] = commitment
+    return opts
+
+def rpc_get_transaction(
+    client: httpx.Client, signature: str, commitment: str | None = None
+) -> Dict[str, Any] | None:
+    j = _rpc_call(client, "getTransaction", [signature, _tx_opts(commitment)])
+    return j.get("result")
+
+def rpc_get_signature_status(client: httpx.Client, signature: str) -> Dict[str, Any] | None:
+    j = _rpc_call(client, "getSignatureStatuses", [[signature], {"searchTransactionHistory": True}])
+    vals = j.get("result", {}).get("value") or []
+    return vals[0] if vals else None
+
+def _rpc_call_result(client: httpx.Client, method: str, params: list) -> Any:
+    try:
+        return _rpc_call(client, method, params).get("result")
+    except (httpx.HTTPError, ValueError):
+        return None
+
+def _rpc_batch_chunk(client: httpx.Client, calls: List[tuple[str, list]], max_concurrency: int) -> List[Any]:
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    try:
+        r = client.post(_rpc_url(), content=orjson.dumps(payload), headers=_JSON_HEADERS)
+        r.raise_for_status()
+        j = orjson.loads(r.content)
+    except httpx.HTTPStatusError:
+        j = None
+    if not isinstance(j, list):
+        # Batching rejected (HTTP 4xx/5xx or a single error object):
+        # fall back to one request per call, run side by side.
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(calls))) as pool:
+            return list(pool.map(lambda call: _rpc_call_result(client, *call), calls))
+    out: List[Any] = [None] * len(calls)
+    for item in j:
+        idx = item.get("id")
+        if isinstance(idx, int) and 0 <= idx < len(out):
+            out[idx] = item.get("result")
     return out
 
-def rpc_get_transaction(client: httpx.Client, signature: str) -> Dict[str, Any] | None:
-    r = client.post(
-        _rpc_url(),
-        json={
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getTransaction",
-            "params": [
-                signature,
-                {
-                    "encoding": "jsonParsed",
-                    "maxSupportedTransactionVersion": 0,
-                },
-            ],
-        },
-    )
-    r.raise_for_status()
-    j = r.json()
+def rpc_batch(client: httpx.Client, calls: List[tuple[str, list]], max_concurrency: int = 8) -> List[Any]:
+    """
+    Send several JSON-RPC calls as batched HTTP requests of up to 50 calls each.
+    Providers that reject batches get one request per call instead.
+    Returns results in call order; failed calls come back as None.
+    """
+    out: List[Any] = []
+    for i in range(0, len(calls), _BATCH_MAX):
+        out.extend(_rpc_batch_chunk(client, calls[i : i + _BATCH_MAX], max_concurrency))
+    return out
+
+def rpc_get_signature_statuses(client: httpx.Client, signatures: List[str]) -> List[Dict[str, Any] | None]:
+    out: List[Dict[str, Any] | None] = []
+    # getSignatureStatuses accepts at most 256 signatures per call.
+    for i in range(0, len(signatures), 256):
+        chunk = signatures[i : i + 256]
+        j = _rpc_call(client, "getSignatureStatuses", [chunk, {"searchTransactionHistory": True}])
+        vals = j.get("result", {}).get("value") or []
+        out.extend(vals + [None] * (len(chunk) - len(vals)))
+    return out
+
+def rpc_get_transactions(
+    client: httpx.Client, signatures: List[str], commitment: str | None = None
+) -> List[Dict[str, Any] | None]:
+    opts = _tx_opts(commitment)
+    return rpc_batch(client, [("getTransaction", [sig, opts]) for sig in signatures])
+
+def rpc_wait_for_signature(
+    client: httpx.Client,
+    signature: str,
+    timeout: float = 15.0,
+    interval: float = 0.2,
+    max_interval: float | None = None,
+) -> Dict[str, Any] | None:
+    """
+    Poll getSignatureStatuses until the signature is confirmed/finalized or errors.
+    With max_interval set, the delay doubles after each miss up to that cap.
+    Returns the last status seen (None if never seen before the timeout).
+    """
+    deadline = time.monotonic() + timeout
+    status = None
+    delay = interval
+    while True:
+        try:
+            status = rpc_get_signature_status(client, signature) or status
+        except Exception:
+            pass
+        if status and (status.get("err") or status.get("confirmationStatus") in ("confirmed", "finalized")):
+            return status
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return status
+        time.sleep(min(delay, remaining))
+        if max_interval is not None:
+            delay = min(delay * 2, max_interval)
+
+async def rpc_get_transaction_async(
+    client: httpx.AsyncClient, signature: str, commitment: str | None = None
+) -> Dict[str, Any] | None:
+    j = await _rpc_call_async(client, "getTransaction", [signature, _tx_opts(commitment)])
     return j.get("result")
 
-def rpc_get_signature_status(client: httpx.Client, signature: str) -> Dict[str, Any] | None:
-    r = client.post(
-        _rpc_url(),
-        json={
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getSignatureStatuses",
-            "params": [[signature], {"searchTransactionHistory": True}],
-        },
-    )
-    r.raise_for_status()
-    j = r.json()
+async def rpc_get_signature_status_async(client: httpx.AsyncClient, signature: str) -> Dict[str, Any] | None:
+    j = await _rpc_call_async(client, "getSignatureStatuses", [[signature], {"searchTransactionHistory": True}])
     vals = j.get("result", {}).get("value") or []
     return vals[0] if vals else None
 
+async def rpc_wait_for_signature_async(
+    client: httpx.AsyncClient,
+    signature: str,
+    timeout: float = 15.0,
+    interval: float = 0.2,
+    max_interval: float | None = None,
+) -> Dict[str, Any] | None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    status = None
+    delay = interval
+    while True:
+        try:
+            status = await rpc_get_signature_status_async(client, signature) or status
+        except Exception:
+            pass
+        if status and (status.get("err") or status.get("confirmationStatus") in ("confirmed", "finalized")):
+            return status
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return status
+        await asyncio.sleep(min(delay, remaining))
+        if max_interval is not None:
+            delay = min(delay * 2, max_interval)
+
 def rpc_get_token_balance_for_owner_mint(
     client: httpx.Client, owner_pubkey: str, mint: str
 ) -> float | None:
@@ -393,47 +554,53 @@ def rpc_get_token_balance_for_owner_mint_any(
         pass
     return None
 
+def _build_delta_index(tx: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One pass over account keys and token balances:
+      accounts: pubkey -> first account index
+      tokens:   (owner, mint) -> [pre_raw, post_raw, pre_decimals, post_decimals]
+    """
+    meta = tx["meta"] or {}
+    msg = tx["transaction"].get("message") or {}
+
+    accounts: Dict[str, int] = {}
+    for i, k in enumerate(msg.get("accountKeys") or []):
+        pk = k.get("pubkey") if isinstance(k, dict) else k
+        accounts.setdefault(pk, i)
+
+    tokens: Dict[tuple, list] = {}
+    for side, items in ((0, meta.get("preTokenBalances")), (1, meta.get("postTokenBalances"))):
+        for it in items or []:
+            entry = tokens.setdefault((it.get("owner"), it.get("mint")), [0, 0, None, None])
+            ui = it.get("uiTokenAmount") or {}
+            entry[side] += int(ui.get("amount") or 0)
+            if entry[2 + side] is None:
+                try:
+                    entry[2 + side] = int(ui.get("decimals") or 0)
+                except Exception:
+                    pass
+
+    return {"accounts": accounts, "tokens": tokens}
+
 def extract_tx_deltas(tx: Dict[str, Any], owner_pubkey: str, mint: str) -> Dict[str, Any]:
     if not tx or "meta" not in tx or "transaction" not in tx:
         return {}
 
+    # Built once per tx, so further (owner, mint) lookups on it are dict hits.
+    index = tx.get("_delta_index")
+    if index is None:
+        index = tx["_delta_index"] = _build_delta_index(tx)
     meta = tx["meta"] or {}
-    msg = tx["transaction"].get("message") or {}
-    keys = msg.get("accountKeys") or []
-
-    owner_index = None
-    for i, k in enumerate(keys):
-        if isinstance(k, dict):
-            pk = k.get("pubkey")
-        else:
-            pk = k
-        if pk == owner_pubkey:
-            owner_index = i
-            break
 
     sol_delta_lamports = None
+    owner_index = index["accounts"].get(owner_pubkey)
     if owner_index is not None:
         pre = meta.get("preBalances") or []
         post = meta.get("postBalances") or []
         if owner_index < len(pre) and owner_index < len(post):
             sol_delta_lamports = int(post[owner_index]) - int(pre[owner_index])
 
-    def _sum_amounts(items):
-        total_raw = 0
-        decimals = None
-        for it in items or []:
-            if it.get("owner") == owner_pubkey and it.get("mint") == mint:
-                ui = it.get("uiTokenAmount") or {}
-                total_raw += int(ui.get("amount") or 0)
-                if decimals is None:
-                    try:
-                        decimals = int(ui.get("decimals") or 0)
-                    except Exception:
-                        decimals = None
-        return total_raw, decimals
-
-    pre_raw, pre_decimals = _sum_amounts(meta.get("preTokenBalances"))
-    post_raw, post_decimals = _sum_amounts(meta.get("postTokenBalances"))
+    pre_raw, post_raw, pre_decimals, post_decimals = index["tokens"].get((owner_pubkey, mint), (0, 0, None, None))
 
     decimals = post_decimals if post_decimals is not None else pre_decimals
 
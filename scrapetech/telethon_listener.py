@@ -8,16 +8,14 @@ from .config import Settings
 from .detector import detect_mints
 from .db import (
     get_or_create_channel,
-    insert_message,
-    insert_signal,
+    insert_message_with_signals,
     active_subscribers_for_channel,
     list_active_channels,
     get_effective_settings,
     update_listener_heartbeat,
     reconcile_position_balance,
     get_position,
-    apply_trade,
-    update_pending_trade_status,
+    apply_trade_and_finalize,
     get_pending_trade,
 )
 from .auto_trader import submit_buy_for_user, confirm_trade
@@ -85,11 +83,18 @@ async def run_listen(channel: str) -> None:
         clean = text.replace("\n", " ")
         log.info("MSG %s | %s", event.id, clean[:120])
 
-        message_id = insert_message(channel_id=channel_id, telegram_message_id=int(event.id), text=text)
-
-        for dm in detect_mints(text):
+        mints = detect_mints(text)
+        # Message + signals in one transaction, off the event loop.
+        await asyncio.to_thread(
+            insert_message_with_signals,
+            channel_id,
+            int(event.id),
+            text,
+            [(dm.mint, int(dm.confidence)) for dm in mints],
+        )
+
+        for dm in mints:
             log.info("DETECTED mint=%s confidence=%s", dm.mint, dm.confidence)
-            insert_signal(channel_id=channel_id, message_id=message_id, mint=dm.mint, confidence=int(dm.confidence))
 
             users = active_subscribers_for_channel(channel)
             if users:
@@ -165,13 +170,7 @@ async def run_listen(channel: str) -> None:
                                     sol_amt,
                                 )
                                 if delta > 0 and sol_amt is not None and sol_amt > 0:
-                                    apply_trade(user_id, mint, "BUY", delta, sol_amt, tx_sig=sig)
-                                    update_pending_trade_status(
-                                        sig,
-                                        "SUCCESS",
-                                        actual_token_amount=delta,
-                                        actual_sol_amount=sol_amt,
-                                    )
+                                    apply_trade_and_finalize(user_id, mint, "BUY", delta, sol_amt, sig)
                                     log.info(
                                         "AUTO_BUY apply_trade: user=%s mint=%s delta=%s sol=%s",
                                         user_id,
@@ -268,11 +267,18 @@ async def run_listen_all(poll_seconds: int = 10) -> None:
         log.info("MSG %s | %s", event.id, clean[:120])
 
         channel_id = get_or_create_channel(handle)
-        message_id = insert_message(channel_id=channel_id, telegram_message_id=int(event.id), text=text)
-
-        for dm in detect_mints(text):
+        mints = detect_mints(text)
+        # Message + signals in one transaction, off the event loop.
+        await asyncio.to_thread(
+            insert_message_with_signals,
+            channel_id,
+            int(event.id),
+            text,
+            [(dm.mint, int(dm.confidence)) for dm in mints],
+        )
+
+        for dm in mints:
             log.info("DETECTED mint=%s confidence=%s", dm.mint, dm.confidence)
-            insert_signal(channel_id=channel_id, message_id=message_id, mint=dm.mint, confidence=int(dm.confidence))
 
             users = active_subscribers_for_channel(handle)
             if users:
@@ -348,13 +354,7 @@ async def run_listen_all(poll_seconds: int = 10) -> None:
                                     sol_amt,
                                 )
                                 if delta > 0 and sol_amt is not None and sol_amt > 0:
-                                    apply_trade(user_id, mint, "BUY", delta, sol_amt, tx_sig=sig)
-                                    update_pending_trade_status(
-                                        sig,
-                                        "SUCCESS",
-                                        actual_token_amount=delta,
-                                        actual_sol_amount=sol_amt,
-                                    )
+                                    apply_trade_and_finalize(user_id, mint, "BUY", delta, sol_amt, sig)
                                     log.info(
                                         "AUTO_BUY apply_trade: user=%s mint=%s delta=%s sol=%s",
                                         user_id,
@@ -9,7 +9,7 @@ from cryptography.fernet import Fernet
 from nacl.signing import SigningKey
 import base58
 
-from .db import init_db, connect, get_or_create_user
+from .db import connect, connect_read, get_or_create_user
 
 def _derive_fernet_key(password: str, salt: bytes) -> bytes:
     # PBKDF2 -> 32 bytes -> base64 urlsafe for Fernet
@@ -118,7 +118,6 @@ def wallet_create(telegram_user_id: str, name: Optional[str] = None, make_defaul
     pw = _get_password()
     user_id = get_or_create_user(telegram_user_id)
 
-    init_db()
     seed = SigningKey.generate().encode()  # 32-byte seed
     sk = SigningKey(seed)
     pubkey = _pubkey_from_signing_key(sk)
@@ -174,7 +173,6 @@ def wallet_import(
     pw = _get_password()
     user_id = get_or_create_user(telegram_user_id)
 
-    init_db()
     seed = _parse_secret(secret)
     sk = SigningKey(seed)
     pubkey = _pubkey_from_signing_key(sk)
@@ -208,7 +206,14 @@ def wallet_import(
 
 def wallet_get_pubkey(telegram_user_id: str) -> Optional[str]:
     user_id = get_or_create_user(telegram_user_id)
-    init_db()
+    # Common case: the user already has wallet_accounts rows, so no migration write is needed.
+    with connect_read() as conn:
+        row = conn.execute(
+            "SELECT pubkey FROM wallet_accounts WHERE user_id=? ORDER BY is_default DESC, id ASC LIMIT 1",
+            (user_id,),
+        ).fetchone()
+    if row:
+        return row["pubkey"]
     with connect() as conn:
         _migrate_wallets_if_needed(conn, user_id)
         row = conn.execute(
@@ -233,7 +238,6 @@ def wallet_get_keypair(telegram_user_id: str, wallet_id: Optional[int] = None) -
     pw = _get_password()
     user_id = get_or_create_user(telegram_user_id)
 
-    init_db()
     with connect() as conn:
         _migrate_wallets_if_needed(conn, user_id)
         if wallet_id is None:
@@ -271,7 +275,6 @@ def wallet_get_keypair(telegram_user_id: str, wallet_id: Optional[int] = None) -
 
 def wallet_list(telegram_user_id: str) -> List[WalletRecord]:
     user_id = get_or_create_user(telegram_user_id)
-    init_db()
     with connect() as conn:
         _migrate_wallets_if_needed(conn, user_id)
         rows = conn.execute(
@@ -290,7 +293,6 @@ def wallet_list(telegram_user_id: str) -> List[WalletRecord]:
 
 def wallet_set_default(telegram_user_id: str, wallet_id: int) -> None:
     user_id = get_or_create_user(telegram_user_id)
-    init_db()
     with connect() as conn:
         _migrate_wallets_if_needed(conn, user_id)
         row = conn.execute(